@@ -0,0 +1,166 @@
+import os
+import time
+import signal
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import tracing
+
+try:
+    import resource
+except ImportError:  # Windows: no rlimits, memory caps become a no-op
+    resource = None
+
+
+# Seconds past --timeout before the parent kills a worker whose in-process alarm couldn't fire
+PARENT_GRACE = 2.0
+
+
+class DocumentTimeout(Exception):
+    """Raised inside a worker when a single PDF exceeds its time budget."""
+
+
+def _on_alarm(signum, frame):
+    raise DocumentTimeout()
+
+
+_extract_from_pdf = None  # set in each worker by _init_worker
+
+
+def _init_worker(max_memory_mb):
+    """Import the extraction stack, then cap the worker's address space so one malformed PDF can't exhaust the box.
+
+    The import happens here rather than per document, so it never counts against a document's timeout.
+    """
+    global _extract_from_pdf
+    from main import extract_from_pdf
+    _extract_from_pdf = extract_from_pdf
+    if max_memory_mb and resource is not None:
+        limit = int(max_memory_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _ready():
+    return os.getpid()
+
+
+def _extract_one(filepath, timeout, store_dir=None):
+    """Worker entry point: returns (result, error, seconds) instead of raising."""
+    start = time.perf_counter()
+    if timeout:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return _extract_from_pdf(filepath, store_dir=store_dir), None, time.perf_counter() - start
+    except DocumentTimeout:
+        return None, f"timed out after {timeout:g}s", time.perf_counter() - start
+    except MemoryError:
+        return None, "exceeded memory cap", time.perf_counter() - start
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}", time.perf_counter() - start
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+        tracing.flush()  # pool workers exit without running atexit hooks
+
+
+def _new_pool(workers, max_memory_mb):
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(max_memory_mb,))
+    # Start every worker before any deadline runs, so the parent's timer doesn't count spawning and imports
+    for future in [executor.submit(_ready) for _ in range(workers)]:
+        future.result()
+    return executor
+
+
+def _terminate(executor):
+    """Kill the pool's workers: the only way to stop one stuck inside MuPDF's C code, where SIGALRM can't land."""
+    for process in list((getattr(executor, "_processes", None) or {}).values()):
+        process.terminate()
+    executor.shutdown(wait=True, cancel_futures=True)
+
+
+def run_batch(filepaths, on_result, workers=None, timeout=None, max_memory_mb=None, store_dir=None):
+    """Extract every PDF on a process pool, calling on_result(filepath, result) as each one finishes.
+
+    At most `workers` documents are in flight, so each one's deadline runs from its submission. A
+    document still running PARENT_GRACE seconds past its timeout has its worker killed: the pool
+    is replaced and the other in-flight documents are resubmitted. When a worker dies, every
+    unfinished document is retried alone on a fresh pool, so only the one that crashes again is
+    reported as crashed.
+
+    Returns a list of (filepath, error, seconds) for every document, in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    stats = {}
+    pending = deque(filepaths)
+    suspects = deque()  # in flight when a worker died: retried one at a time
+    running = {}        # future -> (path, submitted, deadline, isolated)
+    executor = _new_pool(workers, max_memory_mb)
+
+    def submit(path, isolated=False):
+        submitted = time.monotonic()
+        deadline = submitted + timeout + PARENT_GRACE if timeout else None
+        running[executor.submit(_extract_one, path, timeout, store_dir)] = (path, submitted, deadline, isolated)
+
+    def finish(path, result, error, seconds):
+        if error is None:
+            on_result(path, result)
+        stats[path] = (path, error, seconds)
+
+    try:
+        while pending or suspects or running:
+            if suspects:
+                if not running:
+                    submit(suspects.popleft(), isolated=True)
+            else:
+                while pending and len(running) < workers:
+                    submit(pending.popleft())
+
+            deadlines = [d for _, _, d, _ in running.values() if d is not None]
+            wait_for = max(0.0, min(deadlines) - time.monotonic()) if deadlines else None
+            done, _ = wait(running, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            crashed = False
+            for future in done:
+                path, submitted, _, isolated = running.pop(future)
+                try:
+                    finish(path, *future.result())
+                except BrokenProcessPool:  # a worker died (e.g. segfault or the OOM killer)
+                    crashed = True
+                    if isolated:
+                        finish(path, None, "worker crashed", time.monotonic() - submitted)
+                    else:
+                        suspects.append(path)
+
+            now = time.monotonic()
+            expired = [f for f, (_, _, deadline, _) in running.items() if deadline is not None and deadline <= now]
+            for future in expired:
+                path, submitted, _, _ = running.pop(future)
+                finish(path, None, f"timed out after {timeout:g}s (worker killed)", now - submitted)
+
+            if crashed or expired:
+                for future in [f for f in running if f.done() and f.exception() is None]:
+                    path, _, _, _ = running.pop(future)
+                    finish(path, *future.result())
+                _terminate(executor)
+                executor = _new_pool(workers, max_memory_mb)
+                # Unfinished documents go back to the front of the queue, in their original order
+                for path, _, _, isolated in reversed(list(running.values())):
+                    if crashed and not isolated:
+                        suspects.appendleft(path)
+                    else:
+                        pending.appendleft(path)
+                running.clear()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+    return [stats[path] for path in filepaths]
+
+
+def print_summary(stats, elapsed):
+    failures = [s for s in stats if s[1] is not None]
+    print(f"📊 {len(stats) - len(failures)}/{len(stats)} PDFs processed in {elapsed:.2f}s")
+    for path, _, seconds in sorted(stats, key=lambda s: s[2], reverse=True)[:5]:
+        print(f"   ⏱  {seconds:6.2f}s  {os.path.basename(path)}")
+    for path, error, _ in failures:
+        print(f"   ❌ {os.path.basename(path)}: {error}")
@@ -0,0 +1,161 @@
+import re
+import numpy as np
+
+from utils import DATE_LINE_RE, as_layout, is_date_like
+
+# Columns of the per-document line-feature matrix
+SIZE = 0               # max span size on the line, rounded to 0.1pt
+SIZE_RANK = 1          # 0-based rank of SIZE among the page's heading-sized fonts, -1 if not heading-sized
+TOP = 2                # baseline y of the line's last span
+WORD_COUNT = 3
+IS_UPPER = 4           # str.isupper() of the whole line
+NUMBERING_DEPTH = 5    # dots in a leading "2.1.3"-style number, -1 when unnumbered
+NUMBERED_SUBSECTION = 6  # leading "2.1 " number: never merged into the previous line
+IS_DATE = 7
+PAGE = 8               # index of the line's page within the classified batch
+N_FEATURES = 9
+
+HEADING_SIZE_THRESHOLD = 11.5
+MAX_SIZE_LEVELS = 4
+MERGE_DISTANCE = 25
+LEVELS = (None, "H1", "H2", "H3", "H4")
+_PAGE_STRIDE = 1 << 32
+
+NUMBERING_RE = re.compile(r"^(\d+(\.\d+)*)(?=\s|:)")
+SUBSECTION_RE = re.compile(r"^\d+(\.\d+)+\s")
+
+
+def _numbering_depth(text):
+    match = NUMBERING_RE.match(text)
+    return match.group(1).count(".") if match else -1
+
+
+def build_feature_matrix(layouts):
+    """Flatten every line of every layout into one (n_lines, N_FEATURES) matrix plus its texts."""
+    texts = []
+    sizes = []
+    tops = []
+    pages = []
+    for page_index, layout in enumerate(layouts):
+        for line in layout.lines:
+            texts.append(line.text)
+            sizes.append(line.size)
+            tops.append(line.top)
+            pages.append(page_index)
+
+    n = len(texts)
+    features = np.empty((n, N_FEATURES), dtype=np.float64)
+    if not n:
+        return features, texts
+
+    features[:, SIZE] = sizes
+    features[:, TOP] = tops
+    features[:, PAGE] = pages
+    features[:, WORD_COUNT] = np.fromiter((len(t.split()) for t in texts), np.float64, n)
+    features[:, IS_UPPER] = np.fromiter((t.isupper() for t in texts), np.float64, n)
+    features[:, NUMBERING_DEPTH] = np.fromiter((_numbering_depth(t) for t in texts), np.float64, n)
+    features[:, NUMBERED_SUBSECTION] = np.fromiter((SUBSECTION_RE.match(t) is not None for t in texts), np.float64, n)
+    features[:, IS_DATE] = np.fromiter((DATE_LINE_RE.match(t.upper()) is not None for t in texts), np.float64, n)
+    features[:, SIZE_RANK] = _size_ranks(features[:, PAGE], features[:, SIZE])
+    return features, texts
+
+
+def _size_ranks(page, size):
+    """Dense rank of each line's font size among the distinct heading-sized fonts of its page (largest = 0)."""
+    ranks = np.full(len(size), -1.0)
+    big = np.flatnonzero(size > HEADING_SIZE_THRESHOLD)
+    if not len(big):
+        return ranks
+    # One sortable integer per (page, size desc) pair; sizes are already rounded to 0.1pt
+    size10 = np.rint(size[big] * 10).astype(np.int64)
+    keys = page[big].astype(np.int64) * _PAGE_STRIDE + (_PAGE_STRIDE - 1 - size10)
+    unique_keys, inverse = np.unique(keys, return_inverse=True)
+    unique_pages = unique_keys // _PAGE_STRIDE
+    first_of_page = np.searchsorted(unique_pages, unique_pages, side="left")
+    ranks[big] = (np.arange(len(unique_keys)) - first_of_page)[inverse.ravel()]
+    return ranks
+
+
+def assign_levels(features):
+    """Heading level per line (0 = not a heading candidate), computed as whole-matrix array operations."""
+    n = len(features)
+    page = features[:, PAGE].astype(np.int64)
+    size = features[:, SIZE]
+    rank = features[:, SIZE_RANK]
+
+    # Largest distinct sizes map to H1..H4
+    levels = np.where((rank >= 0) & (rank < MAX_SIZE_LEVELS), rank + 1, 0).astype(np.int64)
+
+    # Fallback: numbered patterns ("2.1" → H2, "3.5.1" → H3)
+    depth = features[:, NUMBERING_DEPTH]
+    numbered = depth >= 0
+    levels[numbered] = np.minimum(depth[numbered] + 1, MAX_SIZE_LEVELS)
+
+    # Fallback: ALL CAPS and large text (relative to the page's largest heading size)
+    page_max = np.full(int(page.max()) + 1 if n else 0, -np.inf)
+    big = rank >= 0
+    np.maximum.at(page_max, page[big], size[big])
+    caps = (
+        (levels == 0)
+        & (features[:, IS_UPPER] > 0)
+        & (features[:, WORD_COUNT] <= 6)
+        # A page without heading-sized fonts has no reference size: no caps headings there
+        & np.isfinite(page_max[page])
+        & (size >= page_max[page] * 0.9)
+    ) if n else np.zeros(0, dtype=bool)
+    levels[caps] = 1
+
+    levels[features[:, IS_DATE] > 0] = 0
+    return levels
+
+
+def classify_layouts(layouts):
+    """Return [(level, text), ...] headings for each layout, in layout order."""
+    layouts = [as_layout(layout) for layout in layouts]
+    features, texts = build_feature_matrix(layouts)
+    headings_by_page = [[] for _ in layouts]
+    if not texts:
+        return headings_by_page
+
+    levels = assign_levels(features)
+    candidates = np.flatnonzero(levels)
+    pages = features[candidates, PAGE].astype(np.int64).tolist()
+    tops = features[candidates, TOP].tolist()
+    subsection = (features[candidates, NUMBERED_SUBSECTION] > 0).tolist()
+    cand_levels = levels[candidates].tolist()
+
+    # Merge similar lines close together; only heading candidates reach this loop
+    buffer = ""
+    last_level = None
+    last_top = None
+    last_page = None
+
+    def flush():
+        merged = buffer.strip()
+        if not is_date_like(merged):
+            headings_by_page[last_page].append((LEVELS[last_level], merged))
+
+    for i, line_index in enumerate(candidates.tolist()):
+        text = texts[line_index]
+        level = cand_levels[i]
+        if pages[i] != last_page:
+            if buffer:
+                flush()
+            buffer = ""
+            last_level = None
+            last_top = None
+            last_page = pages[i]
+
+        if last_level == level and abs(tops[i] - last_top) <= MERGE_DISTANCE and not subsection[i]:
+            buffer += " " + text
+        else:
+            if buffer:
+                flush()
+            buffer = text
+            last_level = level
+            last_top = tops[i]
+
+    if buffer:
+        flush()
+
+    return headings_by_page
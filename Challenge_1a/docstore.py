@@ -0,0 +1,221 @@
+"""Versioned, memory-mapped columnar store of parsed PDF layouts, used by Challenge 1A and 1B.
+
+Each PDF is decoded once into span, line and block columns: page, bbox, font size, flags and byte
+offsets into one UTF-8 text buffer. The columns are written to <store_dir>/<content hash>.layout.
+Later runs memory-map that file instead of decoding the PDF again. Files are keyed by MuPDF version,
+and the two containers pin different PyMuPDF releases, so each pipeline only reads the files it wrote.
+
+Challenge_1a/docstore.py and Challenge_1b/docstore_1b.py are identical copies, since each challenge
+builds its own container; benchmarks/check_copies.py fails when they drift.
+"""
+import os
+import json
+import struct
+import hashlib
+
+import fitz  # PyMuPDF
+import numpy as np
+
+FORMAT_VERSION = 1
+MAGIC = b"PDFLAYT\0"
+ALIGN = 16
+# Text only: what get_text("blocks") uses, and get_text("dict") without image blocks
+TEXT_FLAGS = fitz.TEXTFLAGS_BLOCKS
+# Text extraction differs between MuPDF releases, so a layout is only reused by the version that decoded it
+MUPDF_VERSION = fitz.VersionBind
+
+# Offset columns hold n + 1 entries: row i spans [col[i], col[i + 1])
+COLUMNS = {
+    "page_lines": ("<i8", 1),   # page p's lines
+    "page_blocks": ("<i8", 1),  # page p's blocks
+    "line_bbox": ("<f8", 4),
+    "line_spans": ("<i8", 1),   # line i's spans
+    "span_size": ("<f8", 1),
+    "span_flags": ("<i4", 1),
+    "span_origin": ("<f8", 2),
+    "span_text": ("<i8", 1),    # byte offsets of span i's text
+    "block_bbox": ("<f8", 4),
+    "block_text": ("<i8", 1),   # byte offsets of block i's text
+    "text": ("u1", 1),
+}
+
+
+def _aligned(n):
+    return -(-n // ALIGN) * ALIGN
+
+
+def _decode(text, offsets, lo, hi):
+    """Texts lo..hi-1 of an offset column, decoding one contiguous byte range."""
+    bounds = offsets[lo:hi + 1].tolist()
+    if not bounds:
+        return []
+    region = bytes(text[bounds[0]:bounds[-1]])
+    base = bounds[0]
+    return [region[a - base:b - base].decode("utf-8") for a, b in zip(bounds, bounds[1:])]
+
+
+def build_layout(pdf_path, out_path):
+    """Decode every page of pdf_path once and write its columnar layout to out_path."""
+    columns = {name: [] for name in COLUMNS}
+    for name in ("page_lines", "page_blocks", "line_spans", "span_text", "block_text"):
+        columns[name].append(0)
+    span_bytes, block_bytes = [], []
+    span_end = block_end = 0
+
+    with fitz.open(pdf_path) as doc:
+        page_count = len(doc)
+        for page in doc:
+            textpage = page.get_textpage(flags=TEXT_FLAGS)
+            for block in textpage.extractDICT()["blocks"]:
+                if block["type"] != 0:
+                    continue
+                for line in block.get("lines", []):
+                    columns["line_bbox"].append(line["bbox"])
+                    for span in line.get("spans", []):
+                        data = span["text"].encode("utf-8")
+                        span_bytes.append(data)
+                        span_end += len(data)
+                        columns["span_text"].append(span_end)
+                        columns["span_size"].append(span["size"])
+                        columns["span_flags"].append(span["flags"])
+                        columns["span_origin"].append(span["origin"])
+                    columns["line_spans"].append(len(columns["span_size"]))
+            columns["page_lines"].append(len(columns["line_bbox"]))
+
+            for x0, y0, x1, y1, text, *_ in textpage.extractBLOCKS():
+                data = text.encode("utf-8")
+                block_bytes.append(data)
+                block_end += len(data)
+                columns["block_text"].append(block_end)
+                columns["block_bbox"].append((x0, y0, x1, y1))
+            columns["page_blocks"].append(len(columns["block_bbox"]))
+
+    # Block texts follow the span texts in the shared buffer
+    columns["block_text"] = [span_end + offset for offset in columns["block_text"]]
+    columns["text"] = np.frombuffer(b"".join(span_bytes + block_bytes), dtype=np.uint8)
+
+    arrays, header_columns, offset = {}, {}, 0
+    for name, (dtype, width) in COLUMNS.items():
+        array = np.asarray(columns[name], dtype=dtype)
+        array = array.reshape(-1, width) if width > 1 else array.reshape(-1)
+        arrays[name] = array
+        header_columns[name] = {"dtype": dtype, "shape": list(array.shape), "offset": offset}
+        offset = _aligned(offset + array.nbytes)
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "source": os.path.basename(pdf_path),
+        "page_count": page_count,
+        "text_flags": TEXT_FLAGS,
+        "mupdf": MUPDF_VERSION,
+        "columns": header_columns,
+    }).encode("utf-8")
+
+    data_start = _aligned(len(MAGIC) + 4 + len(header))
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(header)) + header)
+        for name, array in arrays.items():
+            f.write(b"\0" * (data_start + header_columns[name]["offset"] - f.tell()))
+            f.write(array.tobytes())
+    os.replace(tmp, out_path)
+
+
+class DocumentLayout:
+    """Read-only, memory-mapped view of one stored layout; use like an open fitz document."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            magic = f.read(len(MAGIC))
+            if magic != MAGIC:
+                raise ValueError(f"'{path}' is not a layout file")
+            (header_len,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_len))
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"'{path}' has layout version {header.get('version')}, expected {FORMAT_VERSION}")
+        if header.get("text_flags") != TEXT_FLAGS or header.get("mupdf") != MUPDF_VERSION:
+            raise ValueError(f"'{path}' was decoded by MuPDF {header.get('mupdf')} with text flags "
+                             f"{header.get('text_flags')}, expected {MUPDF_VERSION} with {TEXT_FLAGS}")
+        self.source = header["source"]
+        self.page_count = header["page_count"]
+
+        data_start = _aligned(len(MAGIC) + 4 + header_len)
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+        self.columns = {}
+        for name, meta in header["columns"].items():
+            dtype = np.dtype(meta["dtype"])
+            start = data_start + meta["offset"]
+            count = int(np.prod(meta["shape"]))
+            self.columns[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(meta["shape"])
+
+    def __len__(self):
+        return self.page_count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.columns = {}
+
+    def page_lines(self, n):
+        """[(line bbox, [(text, size, flags, origin), ...]), ...] for page n, as get_text("dict") orders them."""
+        c = self.columns
+        lo, hi = c["page_lines"][n:n + 2].tolist()
+        if lo == hi:
+            return []
+        line_spans = c["line_spans"][lo:hi + 1].tolist()
+        s_lo, s_hi = line_spans[0], line_spans[-1]
+        texts = _decode(c["text"], c["span_text"], s_lo, s_hi)
+        sizes = c["span_size"][s_lo:s_hi].tolist()
+        flags = c["span_flags"][s_lo:s_hi].tolist()
+        origins = [tuple(o) for o in c["span_origin"][s_lo:s_hi].tolist()]
+        spans = list(zip(texts, sizes, flags, origins))
+        bboxes = [tuple(b) for b in c["line_bbox"][lo:hi].tolist()]
+        return [(bbox, spans[a - s_lo:b - s_lo]) for bbox, a, b in zip(bboxes, line_spans, line_spans[1:])]
+
+    def page_blocks(self, n):
+        """[(x0, y0, x1, y1, text), ...] for page n, the leading fields of get_text("blocks")."""
+        c = self.columns
+        lo, hi = c["page_blocks"][n:n + 2].tolist()
+        texts = _decode(c["text"], c["block_text"], lo, hi)
+        return [(*bbox, text) for bbox, text in zip(c["block_bbox"][lo:hi].tolist(), texts)]
+
+
+class LayoutStore:
+    """Directory of stored layouts keyed by PDF content hash, format version, MuPDF version and text flags.
+
+    Pipelines on different PyMuPDF releases keep separate files side by side instead of rebuilding each other's.
+    """
+
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(store_dir, exist_ok=True)
+
+    def key(self, pdf_path):
+        h = hashlib.sha256(f"layout-v{FORMAT_VERSION}-mupdf{MUPDF_VERSION}-flags{TEXT_FLAGS}".encode("utf-8") + b"\0")
+        with open(pdf_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.store_dir, key + ".layout")
+
+    def open(self, pdf_path):
+        """The stored layout of pdf_path, decoding and storing the PDF first if needed."""
+        path = self.path(self.key(pdf_path))
+        try:
+            layout = DocumentLayout(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            build_layout(pdf_path, path)
+            return DocumentLayout(path)
+        self.hits += 1
+        return layout
+
+    def summary(self):
+        return f"Layout store: {self.hits} hits, {self.misses} built"
@@ -1,32 +1,100 @@
 import os
 import re
 import json
+import time
+import argparse
 import fitz  # PyMuPDF
 
-from utils import merge_title_on_page1, extract_outline_from_page
+from utils import merge_title_on_page1, page_layout
+from classifier import classify_layouts
+from tracing import span
+from stream import OutlineStreamWriter, enforce_memory_budget
+from page_ranges import iter_page_headings_parallel
+from docstore import LayoutStore
 
 INPUT_DIR = "./input"
 OUTPUT_DIR = "./output"
 
-def extract_from_pdf(file_path, page_offset=0):
-    import fitz
-    import re
+# Bump whenever heuristics change so cached outlines are not reused
+EXTRACTOR_VERSION = "1"
 
-    doc = fitz.open(file_path)
-    outline = []
-    seen = set()
+INVALID_TITLE_RE = re.compile(r"\.(cdr|docx?|pdf|ai|indd)$")
+URL_RE = re.compile(r"(http|www\.|\.com)", re.IGNORECASE)
+ADDRESS_RE = re.compile(r"\d{1,5}\s+\w+")
+DAY_MONTH_YEAR_RE = re.compile(r"^\d{1,2} [A-Z]{3,10} \d{4}$")
+PAGE_OF_RE = re.compile(r"^Page \d+ of \d+")
+NON_HEADING_PREFIXES = ("mission", "address", "rsvp", "page", "date", "time", "parents", "guardian")
+
+
+def extract_from_pdf(file_path, page_offset=0, range_workers=1, pages_per_range=64, store_dir=None):
+    title, entries = open_outline(file_path, page_offset, range_workers=range_workers,
+                                  pages_per_range=pages_per_range, store_dir=store_dir)
+    return {
+        "title": title,
+        "outline": list(entries)
+    }
+
+
+def open_outline(file_path, page_offset=0, chunk_pages=None, memory_budget_mb=None,
+                 range_workers=1, pages_per_range=64, store_dir=None):
+    """Extract the title now and return (title, entries), where entries lazily yields outline dicts.
+
+    Pages are parsed and classified chunk_pages at a time (None = the whole document in one batch)
+    and their layouts are released as soon as they are classified. The document is closed once
+    entries is exhausted. With range_workers > 1, documents of at least two ranges are split into
+    pages_per_range page ranges that are classified in separate processes. With store_dir, pages
+    are read from the layout store (see docstore.py) instead of being decoded again.
+    """
+    with span("pdf_open"):
+        doc = LayoutStore(store_dir).open(file_path) if store_dir else fitz.open(file_path)
+
+    # Parse page 1 once; title and outline extraction both read the same layout
+    with span("get_text", pages=1) as s:
+        first_layout = page_layout(doc, 0)
+        s.count(lines=len(first_layout.lines))
 
     # Extract raw title from page 1
-    raw_title = merge_title_on_page1(doc[0])
+    with span("title"):
+        raw_title = merge_title_on_page1(first_layout)
 
     def is_invalid_title(text):
-        return bool(re.search(r"\.(cdr|docx?|pdf|ai|indd)$", text.strip().lower()))
+        return bool(INVALID_TITLE_RE.search(text.strip().lower()))
 
     title = "" if not raw_title or is_invalid_title(raw_title) else raw_title
+    if range_workers > 1 and not store_dir and len(doc) >= 2 * pages_per_range:
+        page_headings = iter_page_headings_parallel(file_path, len(doc), range_workers, pages_per_range)
+    else:
+        page_headings = _iter_page_headings(doc, first_layout, chunk_pages, memory_budget_mb)
+    return title, _iter_outline(doc, first_layout, title, page_offset, page_headings)
+
+
+def _iter_page_headings(doc, first_layout, chunk_pages=None, memory_budget_mb=None):
+    """Yield (page_num, headings) for every page while holding at most one chunk of layouts."""
+    page_count = len(doc)
+    chunk = chunk_pages or page_count
+    start = 0
+    while start < page_count:
+        stop = min(start + chunk, page_count)
+        with span("get_text", pages=stop - max(start, 1)) as s:
+            layouts = [first_layout if n == 0 else page_layout(doc, n) for n in range(start, stop)]
+            s.count(lines=sum(len(layout.lines) for layout in layouts))
+        with span("classify_headings", pages=len(layouts)):
+            headings_by_page = classify_layouts(layouts)
+        del layouts
+        first_layout = None
+
+        yield from enumerate(headings_by_page, start)
+        if memory_budget_mb:
+            chunk = enforce_memory_budget(memory_budget_mb, chunk)
+        start = stop
+
 
-    def is_same_as_title(text, title):
+def _iter_outline(doc, first_layout, title, page_offset, page_headings):
+    seen = set()
+    title_clean = title.strip().lower()
+
+    def is_same_as_title(text):
         text_clean = text.strip().lower()
-        title_clean = title.strip().lower()
         return (
             text_clean == title_clean
             or text_clean.startswith(title_clean)
@@ -37,77 +105,193 @@ def extract_from_pdf(file_path, page_offset=0):
         word_count = len(text.split())
         return (
             word_count <= 8 and
-            not re.search(r"(http|www\.|\.com)", text, re.IGNORECASE) and
-            not text.lower().startswith(("mission", "address", "rsvp", "page", "date", "time", "parents", "guardian"))
-            and not re.match(r"\d{1,5}\s+\w+", text)  # avoid addresses
+            not URL_RE.search(text) and
+            not text.lower().startswith(NON_HEADING_PREFIXES)
+            and not ADDRESS_RE.match(text)  # avoid addresses
         )
 
-    if len(doc) == 1:
-        # 🔹 Single-page: pick only one valid heading
-        headings = extract_outline_from_page(doc[0])
-        for level, text in headings:
-            if is_same_as_title(text, title):
-                continue
-            if text in seen:
-                continue
-            if not is_valid_heading(text):
-                continue
-            if re.match(r"^\d{1,2} [A-Z]{3,10} \d{4}$", text):
-                continue
-            if re.match(r"^Page \d+ of \d+", text):
-                continue
-            seen.add(text)
-            outline.append({
-                "level": "H1",
-                "text": text,
-                "page": 0
-            })
-            break  # ✅ Only one heading
-    else:
-        # 🔹 Multi-page: extract all valid headings
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            headings = extract_outline_from_page(page)
-
+    try:
+        if len(doc) == 1:
+            # 🔹 Single-page: pick only one valid heading
+            with span("classify_headings", pages=1, lines=len(first_layout.lines)):
+                headings = classify_layouts([first_layout])[0]
             for level, text in headings:
-                if is_same_as_title(text, title):
+                if is_same_as_title(text):
                     continue
                 if text in seen:
                     continue
-                if re.match(r"^\d{1,2} [A-Z]{3,10} \d{4}$", text):
+                if not is_valid_heading(text):
                     continue
-                if re.match(r"^Page \d+ of \d+", text):
+                if DAY_MONTH_YEAR_RE.match(text):
+                    continue
+                if PAGE_OF_RE.match(text):
                     continue
                 seen.add(text)
-                outline.append({
-                    "level": level,
+                yield {
+                    "level": "H1",
                     "text": text,
-                    "page": page_num + page_offset
-                })
+                    "page": 0
+                }
+                break  # ✅ Only one heading
+            return
 
-        outline = [h for h in outline if h["page"] > 0]
+        # 🔹 Multi-page: classify pages in batches, filter, and emit entries as each page is done
+        for page_num, headings in page_headings:
+            page = page_num + page_offset
+            entries = []
+            with span("outline_assembly") as s:
+                for level, text in headings:
+                    if is_same_as_title(text):
+                        continue
+                    if text in seen:
+                        continue
+                    if DAY_MONTH_YEAR_RE.match(text):
+                        continue
+                    if PAGE_OF_RE.match(text):
+                        continue
+                    seen.add(text)
+                    # Page-0 headings still suppress later duplicates but are left out of the outline
+                    if page > 0:
+                        entries.append({
+                            "level": level,
+                            "text": text,
+                            "page": page
+                        })
+                s.count(headings=len(entries))
+            yield from entries
+    finally:
+        doc.close()
 
-    return {
-        "title": title,
-        "outline": outline
-    }
 
+def stream_result(filename, file_path, fmt="json", chunk_pages=16, memory_budget_mb=None,
+                  range_workers=1, pages_per_range=64, store_dir=None):
+    """Extract one PDF page-chunk by page-chunk, writing entries as they are found."""
+    ext = ".ndjson" if fmt == "ndjson" else ".json"
+    out_name = filename.rsplit(".", 1)[0] + ext
+    title, entries = open_outline(file_path, chunk_pages=chunk_pages, memory_budget_mb=memory_budget_mb,
+                                  range_workers=range_workers, pages_per_range=pages_per_range,
+                                  store_dir=store_dir)
+    with span("json_write"), OutlineStreamWriter(os.path.join(OUTPUT_DIR, out_name), title, fmt) as writer:
+        for entry in entries:
+            writer.write(entry)
+
+    print(f"✅ Streamed: {filename} → {out_name} ({writer.count} headings)")
+
+
+def write_result(filename, result):
+    json_name = filename.rsplit(".", 1)[0] + ".json"
+    outpath = os.path.join(OUTPUT_DIR, json_name)
+
+    with span("json_write"), open(outpath, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    print(f"✅ Processed: {filename} → {json_name}")
 
 
-def main():
-    for filename in os.listdir(INPUT_DIR):
-        if filename.lower().endswith(".pdf"):
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Extract titles and outlines from every PDF in ./input.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="process-pool size for batch mode (1 = serial, 0 = one per CPU)")
+    parser.add_argument("--timeout", type=float, default=None,
+                        help="per-document time limit in seconds (batch mode only)")
+    parser.add_argument("--max-memory-mb", type=int, default=None,
+                        help="per-worker address-space cap in MB (batch mode only)")
+    parser.add_argument("--cache-dir", default=os.environ.get("OUTLINE_CACHE_DIR"),
+                        help="reuse outlines of unchanged PDFs from this directory")
+    parser.add_argument("--cache-max-mb", type=int, default=512,
+                        help="size bound for the result cache")
+    parser.add_argument("--stream", choices=("json", "ndjson"),
+                        help="walk pages in chunks and write entries incrementally (serial, uncached)")
+    parser.add_argument("--chunk-pages", type=int, default=16,
+                        help="pages parsed and classified per batch in stream mode")
+    parser.add_argument("--memory-budget-mb", type=int, default=None,
+                        help="keep RSS under this budget in stream mode")
+    parser.add_argument("--range-workers", type=int, default=1,
+                        help="split each large PDF into page ranges parsed by this many processes (serial mode)")
+    parser.add_argument("--pages-per-range", type=int, default=64,
+                        help="pages per range for --range-workers")
+    parser.add_argument("--layout-store", default=os.environ.get("LAYOUT_STORE_DIR"),
+                        help="decode each PDF once into this layout store and read pages from it")
+    args = parser.parse_args(argv)
+    if args.stream and (args.workers != 1 or args.cache_dir):
+        parser.error("--stream runs serially and cannot be combined with --workers or --cache-dir")
+    if args.range_workers > 1 and args.workers != 1:
+        parser.error("--range-workers parallelizes within a document and cannot be combined with --workers")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    filenames = [f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".pdf")]
+
+    if args.stream:
+        from batch import print_summary
+
+        # A document that fails (e.g. over --memory-budget-mb) is reported like a batch failure
+        start = time.perf_counter()
+        stats = []
+        for filename in filenames:
             filepath = os.path.join(INPUT_DIR, filename)
+            t_start = time.perf_counter()
+            error = None
+            try:
+                stream_result(filename, filepath, args.stream,
+                              args.chunk_pages, args.memory_budget_mb, args.range_workers, args.pages_per_range,
+                              args.layout_store)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            stats.append((filepath, error, time.perf_counter() - t_start))
+        print_summary(stats, time.perf_counter() - start)
+        return
+
+    # 🔹 Serve unchanged PDFs from the cache, extract only new or modified ones
+    cache = None
+    keys = {}
+    if args.cache_dir:
+        from cache import ResultCache
 
-            result = extract_from_pdf(filepath)  # 🔍 Use the extraction function
+        cache = ResultCache(args.cache_dir, EXTRACTOR_VERSION, args.cache_max_mb * 1024 * 1024)
+        pending = []
+        for filename in filenames:
+            key = keys[filename] = cache.key(os.path.join(INPUT_DIR, filename))
+            cached = cache.get(key)
+            if cached is None:
+                pending.append(filename)
+            else:
+                write_result(filename, cached)
+        filenames = pending
 
-            json_name = filename.rsplit(".", 1)[0] + ".json"
-            outpath = os.path.join(OUTPUT_DIR, json_name)
+    def on_result(filename, result):
+        write_result(filename, result)
+        if cache:
+            cache.put(keys[filename], result)
 
-            with open(outpath, "w", encoding="utf-8") as f:
-                json.dump(result, f, indent=2, ensure_ascii=False)
+    if args.workers == 1:
+        for filename in filenames:
+            filepath = os.path.join(INPUT_DIR, filename)
+            result = extract_from_pdf(filepath, range_workers=args.range_workers,
+                                      pages_per_range=args.pages_per_range,
+                                      store_dir=args.layout_store)  # 🔍 Use the extraction function
+            on_result(filename, result)
+    else:
+        # 🔹 Batch mode: one process per worker, per-document limits, summary at the end
+        from batch import run_batch, print_summary
+
+        start = time.perf_counter()
+        filepaths = [os.path.join(INPUT_DIR, f) for f in filenames]
+        stats = run_batch(
+            filepaths,
+            lambda path, result: on_result(os.path.basename(path), result),
+            workers=args.workers or None,
+            timeout=args.timeout,
+            max_memory_mb=args.max_memory_mb,
+            store_dir=args.layout_store,
+        )
+        print_summary(stats, time.perf_counter() - start)
 
-            print(f"✅ Processed: {filename} → {json_name}")
+    if cache:
+        cache.evict()
+        print(cache.summary())
 
 
 if __name__ == "__main__":
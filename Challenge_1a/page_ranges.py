@@ -0,0 +1,37 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz  # PyMuPDF
+
+from utils import PageLayout
+from classifier import classify_layouts
+import tracing
+from tracing import span
+
+
+def page_ranges(page_count, pages_per_range):
+    return [(start, min(start + pages_per_range, page_count)) for start in range(0, page_count, pages_per_range)]
+
+
+def classify_page_range(file_path, start, stop):
+    """Worker entry point: open the PDF independently and return the headings of pages [start, stop)."""
+    try:
+        with fitz.open(file_path) as doc:
+            with span("get_text", pages=stop - start):
+                layouts = [PageLayout.from_page(doc[n]) for n in range(start, stop)]
+            with span("classify_headings", pages=len(layouts)):
+                return classify_layouts(layouts)
+    finally:
+        tracing.flush()  # pool workers exit without running atexit hooks
+
+
+def iter_page_headings_parallel(file_path, page_count, workers, pages_per_range):
+    """Yield (page_num, headings) in page order while ranges are classified on a process pool.
+
+    Heading classification only looks at one page at a time, so the merged stream is identical to a
+    serial run; per-document state (title, seen set) stays with the caller.
+    """
+    ranges = page_ranges(page_count, pages_per_range)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as executor:
+        futures = [executor.submit(classify_page_range, file_path, start, stop) for start, stop in ranges]
+        for (start, _), future in zip(ranges, futures):
+            yield from enumerate(future.result(), start)
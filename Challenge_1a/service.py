@@ -0,0 +1,145 @@
+import os
+import json
+import argparse
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from batch import PARENT_GRACE, _init_worker, _extract_one, _terminate
+
+DEFAULT_PORT = 8011
+
+
+def _warm():
+    """Make a worker spawn (its initializer imports the extraction stack) so the first real request doesn't pay for it."""
+    import main  # noqa: F401
+    return os.getpid()
+
+
+class OutlineService:
+    """Warm process pool that answers outline-extraction requests with the same JSON main.py writes."""
+
+    def __init__(self, workers=None, timeout=None, max_memory_mb=None, store_dir=None):
+        self.workers = workers or os.cpu_count() or 1
+        self.timeout = timeout
+        self.store_dir = store_dir
+        self.max_memory_mb = max_memory_mb
+        self._lock = threading.Lock()
+        self.executor = self._start_pool()
+
+    def _start_pool(self):
+        executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                       initargs=(self.max_memory_mb,))
+        # One warm-up task per worker forces every process to spawn and import PyMuPDF now
+        for future in [executor.submit(_warm) for _ in range(self.workers)]:
+            future.result()
+        return executor
+
+    def _restart_pool(self, broken, kill=False):
+        """Replace a pool broken by a dead worker; concurrent requests that saw the same pool break restart it once.
+
+        kill=True first terminates the workers, for one stuck where the in-worker alarm can't reach it.
+        """
+        with self._lock:
+            if self.executor is broken:
+                # The new pool goes in first, so requests that lose their worker to the kill see it replaced
+                self.executor = self._start_pool()
+                if kill:
+                    _terminate(broken)
+                else:
+                    broken.shutdown(wait=False)
+
+    def extract(self, path):
+        # The worker's SIGALRM can't interrupt MuPDF's C code, so the parent enforces the limit too
+        limit = self.timeout + PARENT_GRACE if self.timeout else None
+        for attempt in range(2):
+            executor = self.executor
+            try:
+                result, error, _ = executor.submit(_extract_one, path, self.timeout, self.store_dir).result(timeout=limit)
+                break
+            except BrokenProcessPool:
+                # Retried once if another request's crash or timeout replaced the pool under this one
+                replaced = self.executor is not executor
+                self._restart_pool(executor)
+                if attempt or not replaced:
+                    raise RuntimeError("worker crashed")
+            except TimeoutError:
+                self._restart_pool(executor, kill=True)
+                raise RuntimeError(f"timed out after {self.timeout:g}s (worker killed)")
+        if error is not None:
+            raise RuntimeError(error)
+        return result
+
+    def shutdown(self):
+        self.executor.shutdown()
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, indent=2, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "workers": service.workers})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/outline":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(request, dict) or not isinstance(request.get("path"), str):
+                    raise ValueError("bad request")
+                path = request["path"]
+            except (ValueError, KeyError, TypeError):
+                self._send(400, {"error": "expected a JSON body like {\"path\": \"/abs/file.pdf\"}"})
+                return
+            if not os.path.isfile(path):
+                self._send(404, {"error": f"no such file: {path}"})
+                return
+            try:
+                self._send(200, service.extract(path))
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass  # keep the service quiet; failures are reported in the response body
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve outline extraction over localhost HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=0, help="pool size (0 = one per CPU)")
+    parser.add_argument("--timeout", type=float, default=None, help="per-document time limit in seconds")
+    parser.add_argument("--max-memory-mb", type=int, default=None, help="per-worker address-space cap in MB")
+    parser.add_argument("--layout-store", default=os.environ.get("LAYOUT_STORE_DIR"),
+                        help="layout store directory (see docstore.py)")
+    args = parser.parse_args(argv)
+
+    service = OutlineService(args.workers or None, args.timeout, args.max_memory_mb, args.layout_store)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"🚀 Outline service ready on http://{args.host}:{args.port} ({service.workers} warm workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import gc
+import os
+import sys
+import json
+
+import fitz  # PyMuPDF
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def current_rss_mb():
+    """Resident set size right now (falls back to the peak where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        if resource is None:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def enforce_memory_budget(budget_mb, chunk_pages):
+    """Called between page chunks: returns the chunk size to use next, or raises MemoryError.
+
+    Over budget, first drop MuPDF's object cache and Python garbage, then halve the chunk size.
+    Only when a single page per chunk still doesn't fit is the document given up on.
+    """
+    if current_rss_mb() <= budget_mb:
+        return chunk_pages
+    gc.collect()
+    fitz.TOOLS.store_shrink(100)
+    if current_rss_mb() <= budget_mb:
+        return chunk_pages
+    if chunk_pages > 1:
+        return max(1, chunk_pages // 2)
+    raise MemoryError(f"RSS {current_rss_mb():.0f} MB exceeds the {budget_mb} MB budget")
+
+
+class OutlineStreamWriter:
+    """Writes outline entries as they are produced instead of holding the whole outline in memory.
+
+    fmt="json" produces byte-for-byte the same file as json.dump(result, indent=2, ensure_ascii=False);
+    fmt="ndjson" writes a {"title": ...} line followed by one entry per line. Entries go to a
+    temporary file that only replaces `path` once the outline is complete; if extraction fails
+    midway, the partial file is deleted instead of being closed into valid but truncated JSON.
+    """
+
+    def __init__(self, path, title, fmt="json"):
+        self.fmt = fmt
+        self.count = 0
+        self.path = path
+        self.tmp_path = f"{path}.{os.getpid()}.part"
+        self.f = open(self.tmp_path, "w", encoding="utf-8")
+        if fmt == "ndjson":
+            self.f.write(json.dumps({"title": title}, ensure_ascii=False) + "\n")
+        else:
+            self.f.write('{\n  "title": ' + json.dumps(title, ensure_ascii=False) + ',\n  "outline": [')
+
+    def write(self, entry):
+        if self.fmt == "ndjson":
+            self.f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        else:
+            body = json.dumps(entry, indent=2, ensure_ascii=False).replace("\n", "\n    ")
+            self.f.write(("\n    " if self.count == 0 else ",\n    ") + body)
+        self.count += 1
+
+    def close(self):
+        if self.fmt != "ndjson":
+            self.f.write("\n  ]\n}" if self.count else "]\n}")
+        self.f.close()
+        os.replace(self.tmp_path, self.path)
+
+    def abort(self):
+        self.f.close()
+        os.remove(self.tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
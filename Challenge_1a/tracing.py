@@ -0,0 +1,141 @@
+"""Opt-in stage tracing: wall time, CPU time, peak RSS and item counts per span.
+
+Set PIPELINE_TRACE_DIR to a directory to enable it. Each process then writes a Chrome-trace file
+(open it in chrome://tracing or Perfetto) and a per-run metrics file there at exit. When the variable
+is unset, span() hands back one shared no-op object, so instrumented code pays a function call per
+stage and nothing else.
+
+Challenge_1a/tracing.py and Challenge_1b/tracing_1b.py are identical copies, since each challenge
+builds its own container; benchmarks/check_copies.py fails when they drift.
+"""
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+
+try:
+    import resource
+except ImportError:  # Windows: peak RSS is not reported
+    resource = None
+
+TRACE_DIR = os.environ.get("PIPELINE_TRACE_DIR")
+ENABLED = bool(TRACE_DIR)
+
+_events = []
+_metrics = {}         # per-stage totals of every span flushed so far
+_metrics_pid = None   # process the totals belong to
+_trace_pid = None     # process whose trace file has been opened with its leading "["
+_lock = threading.Lock()
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, **items):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    __slots__ = ("name", "items", "_start", "_cpu_start")
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        self._cpu_start = time.thread_time_ns()
+        return self
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter_ns() - self._start
+        cpu = time.thread_time_ns() - self._cpu_start
+        event = (self.name, self._start, wall, cpu, _peak_rss_kb(), self.items,
+                 os.getpid(), threading.get_ident())
+        with _lock:
+            _events.append(event)
+        return False
+
+    def count(self, **items):
+        """Add item counts (pages, lines, sections, tokens, ...) to the span."""
+        for key, value in items.items():
+            self.items[key] = self.items.get(key, 0) + value
+
+
+def span(name, **items):
+    """Context manager timing one pipeline stage; a no-op unless tracing is enabled."""
+    if not ENABLED:
+        return _NOOP
+    return Span(name, dict(items))
+
+
+def enable(trace_dir):
+    global TRACE_DIR, ENABLED
+    TRACE_DIR = trace_dir
+    ENABLED = True
+
+
+def flush():
+    """Append this process's new spans to <dir>/trace-<pid>.json and rewrite <dir>/metrics-<pid>.json.
+
+    Flushed spans are dropped from the buffer; only the per-stage totals are kept, so flushing after
+    every document in a long-lived worker writes each span once.
+    """
+    global _metrics, _metrics_pid, _trace_pid
+    if not ENABLED:
+        return
+    pid = os.getpid()
+    with _lock:
+        if _metrics_pid != pid:
+            # Forked workers inherit the parent's buffer and totals; only export what is recorded here
+            _metrics, _metrics_pid = {}, pid
+        events = [e for e in _events if e[6] == pid]
+        _events.clear()
+        if not events:
+            return
+
+        trace_events = []
+        for name, start, wall, cpu, rss, items, event_pid, tid in events:
+            args = {"cpu_ms": round(cpu / 1e6, 3), "peak_rss_kb": rss, **items}
+            trace_events.append(json.dumps({
+                "name": name, "cat": "pipeline", "ph": "X",
+                "ts": start / 1e3, "dur": wall / 1e3,
+                "pid": event_pid, "tid": tid, "args": args,
+            }))
+            m = _metrics.setdefault(name, {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_rss_kb": 0, "items": {}})
+            m["calls"] += 1
+            m["wall_s"] += wall / 1e9
+            m["cpu_s"] += cpu / 1e9
+            m["peak_rss_kb"] = max(m["peak_rss_kb"], rss or 0)
+            for key, value in items.items():
+                m["items"][key] = m["items"].get(key, 0) + value
+
+        os.makedirs(TRACE_DIR, exist_ok=True)
+        # JSON array trace format, whose closing bracket is optional, so each flush only appends
+        started = _trace_pid == pid
+        with open(os.path.join(TRACE_DIR, f"trace-{pid}.json"), "a" if started else "w", encoding="utf-8") as f:
+            f.write((",\n" if started else "[\n") + ",\n".join(trace_events))
+        _trace_pid = pid
+        with open(os.path.join(TRACE_DIR, f"metrics-{pid}.json"), "w", encoding="utf-8") as f:
+            json.dump({"pid": pid, "spans": _metrics}, f, indent=2)
+
+
+atexit.register(flush)
@@ -1,14 +1,19 @@
 import fitz  # PyMuPDF
-from collections import defaultdict, Counter
+from collections import defaultdict
 
 
 import re
 import fitz
-from collections import Counter
+
+from docstore import DocumentLayout
+
+
+DATE_LINE_RE = re.compile(r"^\d{1,2}\s+\w+\s+\d{4}$")
+DATE_RE = re.compile(r"\d{1,2} [A-Z]{3,10} \d{4}")
 
 
 def is_date_line(text):
-    return re.match(r"^\d{1,2}\s+\w+\s+\d{4}$", text.strip().upper())
+    return DATE_LINE_RE.match(text.strip().upper())
 
 
 def is_date_like(text):
@@ -18,8 +23,7 @@ def is_date_like(text):
     # Normalize
     text = text.strip().upper()
 
-    date_pattern = re.compile(r"\d{1,2} [A-Z]{3,10} \d{4}")
-    matches = date_pattern.findall(text)
+    matches = DATE_RE.findall(text)
 
     # Count how many words are part of these matches
     total_words = len(text.split())
@@ -28,27 +32,95 @@ def is_date_like(text):
     # If 90% or more of the words are dates, it's not a heading
     return total_words > 0 and total_date_words / total_words >= 0.9 and len(matches) >= 2
 
+class LineRecord:
+    """Compact text line: joined text, max span size, baseline of last span, OR-ed span flags."""
+    __slots__ = ("text", "size", "top", "flags", "spans")
+
+    def __init__(self, text, size, top, flags, spans):
+        self.text = text
+        self.size = size
+        self.top = top
+        self.flags = flags
+        self.spans = spans  # tuple of (text, rounded size) pairs
+
+
+class PageLayout:
+    """Text lines of one page, parsed once and shared by title and outline extraction."""
+    __slots__ = ("number", "lines")
+
+    # Image blocks are skipped by every consumer, so don't let MuPDF decode them.
+    TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_IMAGES
+
+    def __init__(self, number, lines):
+        self.number = number
+        self.lines = lines
+
+    @staticmethod
+    def _line_record(raw_spans):
+        """LineRecord from (text, size, flags, origin) spans, or None when every span is blank."""
+        spans = []
+        max_size = 0
+        top = 0
+        flags = 0
+        for text, size, span_flags, origin in raw_spans:
+            text = text.strip()
+            if not text:
+                continue
+            size = round(size, 1)
+            spans.append((text, size))
+            max_size = max(max_size, size)
+            top = origin[1]
+            flags |= span_flags
+        if not spans:
+            return None
+        return LineRecord(" ".join(t for t, _ in spans), max_size, top, flags, tuple(spans))
+
+    @classmethod
+    def from_page(cls, page):
+        lines = []
+        for block in page.get_text("dict", flags=cls.TEXT_FLAGS)["blocks"]:
+            if block["type"] != 0:
+                continue
+            for line in block.get("lines", []):
+                record = cls._line_record((span["text"], span["size"], span["flags"], span["origin"])
+                                          for span in line.get("spans", []))
+                if record:
+                    lines.append(record)
+        return cls(page.number, lines)
+
+    @classmethod
+    def from_stored(cls, layout, n):
+        """Same lines as from_page, read from a docstore.DocumentLayout without decoding the PDF."""
+        lines = []
+        for _, raw_spans in layout.page_lines(n):
+            record = cls._line_record(raw_spans)
+            if record:
+                lines.append(record)
+        return cls(n, lines)
+
+
+def page_layout(doc, n):
+    """PageLayout of page n of an open fitz document or a stored DocumentLayout."""
+    if isinstance(doc, DocumentLayout):
+        return PageLayout.from_stored(doc, n)
+    return PageLayout.from_page(doc[n])
+
+
+def as_layout(page):
+    """Accept either a parsed PageLayout or a raw fitz page."""
+    return page if isinstance(page, PageLayout) else PageLayout.from_page(page)
+
+
 def merge_title_on_page1(page, size_threshold=11.5):
     """Extract merged title from largest font lines at top of page."""
-    blocks = page.get_text("dict")["blocks"]
+    layout = as_layout(page)
     lines_by_size = defaultdict(list)
 
-    for block in blocks:
-        if block["type"] != 0:
-            continue
-        for line in block.get("lines", []):
-            full_line = ""
-            max_size = 0
-            for span in line.get("spans", []):
-                text = span["text"].strip()
-                if not text:
-                    continue
-                size = round(span["size"], 1)
-                if size > size_threshold:
-                    full_line += text + " "
-                    max_size = max(max_size, size)
-            if full_line.strip():
-                lines_by_size[max_size].append(full_line.strip())
+    for line in layout.lines:
+        parts = [(text, size) for text, size in line.spans if size > size_threshold]
+        if parts:
+            max_size = max(size for _, size in parts)
+            lines_by_size[max_size].append(" ".join(text for text, _ in parts))
 
     if not lines_by_size:
         return ""
@@ -60,89 +132,7 @@ def merge_title_on_page1(page, size_threshold=11.5):
 
 
 def extract_outline_from_page(page):
-    from collections import Counter
-    import re
-
-    blocks = page.get_text("dict")["blocks"]
-    lines = []
-    sizes = []
-
-    for block in blocks:
-        if block["type"] != 0:
-            continue
-        for line in block.get("lines", []):
-            line_text = ""
-            max_size = 0
-            top = 0
-            for span in line.get("spans", []):
-                text = span["text"].strip()
-                if not text:
-                    continue
-                line_text += text + " "
-                max_size = max(max_size, round(span["size"], 1))
-                top = span["origin"][1]
-            if line_text.strip():
-                lines.append({"text": line_text.strip(), "size": max_size, "top": top})
-                sizes.append(max_size)
-
-    # Analyze font sizes
-    size_counter = Counter(sizes)
-    sorted_sizes = sorted([s for s in size_counter if s > 11.5], reverse=True)
-    size_to_level = {}
-    if len(sorted_sizes) > 0:
-        size_to_level[sorted_sizes[0]] = "H1"
-    if len(sorted_sizes) > 1:
-        size_to_level[sorted_sizes[1]] = "H2"
-    if len(sorted_sizes) > 2:
-        size_to_level[sorted_sizes[2]] = "H3"
-    if len(sorted_sizes) > 3:
-        size_to_level[sorted_sizes[3]] = "H4"
-
-    headings = []
-    buffer = ""
-    last_level = None
-    last_top = None
-
-    for line in lines:
-        level = size_to_level.get(line["size"])
-        text = line["text"]
-
-        # Fallback: numbered patterns (not used in your file04 but still useful)
-        match = re.match(r"^(\d+(\.\d+)*)(?=\s|:)", text)
-        if match:
-            dot_count = match.group(1).count(".")
-            level = f"H{min(dot_count + 1, 4)}"
-
-        # Fallback: ALL CAPS and large text
-        if not level:
-            if (
-                text.isupper()
-                and len(text.split()) <= 6
-                and (sorted_sizes and line["size"] >= sorted_sizes[0] * 0.9)
-            ):
-                level = "H1"
-            else:
-                continue
+    """Return [(level, text), ...] headings for a single page (see classifier.classify_layouts)."""
+    from classifier import classify_layouts
 
-        if is_date_line(text):
-            continue
-
-        # Merge similar lines close together
-        if last_level == level and abs(line["top"] - last_top) <= 25 and not re.match(r"^\d+(\.\d+)+\s", text):
-            buffer += " " + text
-        else:
-            if buffer:
-                merged = buffer.strip()
-                if not is_date_like(merged):
-                    headings.append((last_level, merged))
-            buffer = text
-            last_level = level
-            last_top = line["top"]
-
-    # Flush remaining
-    if buffer:
-        merged = buffer.strip()
-        if not is_date_like(merged):
-            headings.append((last_level, merged))
-
-    return headings
+    return classify_layouts([page])[0]
@@ -0,0 +1,149 @@
+"""Lexical BM25 index over section titles and contents, used to prune candidates before embedding.
+
+Sections are tokenized with the same word tokenizer and stopword set as the Summarizer, and added
+incrementally as each PDF finishes parsing. Sections are keyed by content hash, so an index persisted
+with save() is reused across runs: sections it already holds are not tokenized again.
+"""
+import os
+import threading
+import hashlib
+from array import array
+
+import numpy as np
+
+from utils_1b import RelevanceRanker, load_stopwords, load_tokenizers
+from vector_index_1b import top_k_indices
+
+INDEX_VERSION = 1
+
+
+class BM25Index:
+    """Inverted index of term -> (section ids, term frequencies) scored with Okapi BM25."""
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.keys = []
+        self.key_to_id = {}
+        self.doc_len = array("i")
+        self.postings = {}  # term -> (array of section ids, array of term frequencies)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self.key_to_id
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def tokenize(text: str) -> list:
+        """Lowercased content words: the Summarizer's word_tokenize + stopword filtering."""
+        stop_words = load_stopwords()
+        word_tokenize = load_tokenizers()[1]
+        return [w for w in word_tokenize(text.lower(), preserve_line=True) if w.isalnum() and w not in stop_words]
+
+    def add(self, keys: list, texts: list):
+        """Indexes each text under its key; keys already in the index are skipped."""
+        for key, text in zip(keys, texts):
+            if key in self.key_to_id:
+                continue
+            doc_id = len(self.keys)
+            self.key_to_id[key] = doc_id
+            self.keys.append(key)
+            terms = self.tokenize(text)
+            self.doc_len.append(len(terms))
+            counts = {}
+            for term in terms:
+                counts[term] = counts.get(term, 0) + 1
+            for term, tf in counts.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array("i"), array("i"))
+                posting[0].append(doc_id)
+                posting[1].append(tf)
+
+    def add_sections(self, sections: list):
+        texts = [RelevanceRanker.section_text(sec) for sec in sections]
+        self.add([self.key(text) for text in texts], texts)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every indexed section for the query (float64, indexed by section id)."""
+        n = len(self.keys)
+        scores = np.zeros(n, dtype=np.float64)
+        if n == 0:
+            return scores
+        doc_len = np.frombuffer(self.doc_len, dtype=np.intc).astype(np.float64)
+        avgdl = max(doc_len.mean(), 1.0)
+        norm = self.k1 * (1.0 - self.b + self.b * doc_len / avgdl)
+        for term in dict.fromkeys(self.tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            ids = np.frombuffer(posting[0], dtype=np.intc)
+            tf = np.frombuffer(posting[1], dtype=np.intc).astype(np.float64)
+            idf = np.log1p((n - len(ids) + 0.5) / (len(ids) + 0.5))
+            scores[ids] += idf * tf * (self.k1 + 1.0) / (tf + norm[ids])
+        return scores
+
+    def doc_ids(self, texts) -> np.ndarray:
+        """Index ids of an iterable of 'title. content' section texts (RelevanceRanker.section_text,
+        SectionStore.texts), adding the ones not indexed yet. Hash once, then prefilter per query."""
+        ids = array("i")
+        for text in texts:
+            key = self.key(text)
+            if key not in self.key_to_id:
+                self.add([key], [text])
+            ids.append(self.key_to_id[key])
+        return np.frombuffer(ids, dtype=np.intc)
+
+    def prefilter(self, ids: np.ndarray, query: str, n: int) -> list:
+        """Positions in ids (from doc_ids) of the n best BM25 scores, in input order (all if n >= len).
+
+        Ties, including sections with no query term at all, go to the earlier position.
+        """
+        if n >= len(ids):
+            return list(range(len(ids)))
+        return sorted(top_k_indices(self.scores(query)[ids], n).tolist())
+
+    def save(self, path: str):
+        terms = list(self.postings)
+        lengths = np.array([len(self.postings[t][0]) for t in terms], dtype=np.int64)
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        # Per-writer temp name: concurrent saves of the same path never write into one file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp,
+            version=INDEX_VERSION,
+            params=np.array([self.k1, self.b]),
+            keys=np.array(self.keys, dtype=str),
+            doc_len=np.frombuffer(self.doc_len, dtype=np.intc),
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            ids=np.frombuffer(b"".join(bytes(self.postings[t][0]) for t in terms), dtype=np.intc),
+            tfs=np.frombuffer(b"".join(bytes(self.postings[t][1]) for t in terms), dtype=np.intc),
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str):
+        """Loads an index saved with save(), or returns a new empty one if it is missing or incompatible."""
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != INDEX_VERSION:
+                    raise ValueError("incompatible index")
+                k1, b = data["params"].tolist()
+                index = cls(k1, b)
+                index.keys = data["keys"].tolist()
+                index.doc_len = array("i", data["doc_len"].astype(np.intc).tobytes())
+                offsets = data["offsets"].tolist()
+                ids = data["ids"].astype(np.intc)
+                tfs = data["tfs"].astype(np.intc)
+                for term, lo, hi in zip(data["terms"].tolist(), offsets, offsets[1:]):
+                    index.postings[term] = (array("i", ids[lo:hi].tobytes()), array("i", tfs[lo:hi].tobytes()))
+        except (OSError, ValueError, KeyError):
+            return cls()
+        index.key_to_id = {key: i for i, key in enumerate(index.keys)}
+        return index
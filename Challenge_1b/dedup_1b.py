@@ -0,0 +1,133 @@
+"""Near-duplicate section elimination with MinHash locality-sensitive hashing.
+
+Each section's `title. content` text is split into word shingles. A MinHash signature estimates the
+Jaccard similarity between shingle sets, and banding the signature into an LSH table finds candidate
+pairs without comparing every section to every other. A section whose estimated similarity to an
+earlier kept section reaches the threshold is dropped. The earlier section then lists both in its
+`provenance`. Only a (source, page, text digest) handle, the signature and the merged locations are held
+per kept section, never the section itself.
+"""
+import re
+import zlib
+import hashlib
+
+import numpy as np
+
+from sections_1b import provenance_entry
+
+MERSENNE_61 = np.uint64((1 << 61) - 1)
+_WORD = re.compile(r"\w+")
+
+
+def _entry(section):
+    return provenance_entry(section["source"], section["page"])
+
+
+def _text(section):
+    return f"{section.get('title', '')}. {section.get('content', '')}"
+
+
+def _handle(section):
+    """(source, page, text digest): identifies a kept section dict without holding it or tagging it."""
+    return section["source"], section["page"], hashlib.blake2b(_text(section).encode("utf-8"), digest_size=8).digest()
+
+
+class SectionDeduplicator:
+    """Keeps the first of each group of near-identical sections, in the order sections are added.
+
+    num_perm is split into `bands` bands. With 16 bands of 8 rows, pairs at 0.8 Jaccard become candidates
+    with ~95% probability (99.99% at 0.9), and pairs below 0.5 rarely do. Candidates are kept apart unless
+    their signatures agree on at least `threshold` of the positions.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16, shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # (a * x + b) mod 2^61 - 1 with a, b, x < 2^32 never overflows uint64
+        self._a = rng.integers(1, 1 << 32, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, num_perm, dtype=np.uint64)
+        self._token_hashes = {}
+        self.kept = []        # handles of the representatives: (source, page, digest) tuples, or SectionStore rows
+        self.signatures = []  # their MinHash signatures
+        self.provenance = {}  # handle in kept -> [{"document", "page_number"}, ...] for groups add() merged
+        self._buckets = {}    # (band, band bytes) -> ids into kept
+        self.removed = 0
+
+    def shingles(self, text: str) -> np.ndarray:
+        """Distinct 32-bit hashes of the text's lowercased word shingles."""
+        cache = self._token_hashes
+        tokens = []
+        for word in _WORD.findall(text.lower()):
+            h = cache.get(word)
+            if h is None:
+                h = cache[word] = zlib.crc32(word.encode("utf-8"))
+            tokens.append(h)
+        if not tokens:
+            return np.zeros(0, dtype=np.uint64)
+        hashes = np.asarray(tokens, dtype=np.uint64)
+        k = min(self.shingle_size, len(hashes))
+        combined = np.zeros(len(hashes) - k + 1, dtype=np.uint64)
+        for j in range(k):
+            combined = (combined * np.uint64(1000003) + hashes[j:len(hashes) - k + 1 + j]) & np.uint64(0xFFFFFFFF)
+        return np.unique(combined)
+
+    def signature(self, text: str):
+        """MinHash signature (uint32, num_perm) of the text, or None when it has no words."""
+        shingles = self.shingles(text)
+        if not len(shingles):
+            return None
+        hashed = (self._a[:, None] * shingles[None, :] + self._b[:, None]) % MERSENNE_61
+        return (hashed.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def _band_keys(self, signature):
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def find_or_add(self, text: str, handle):
+        """The id into kept of an earlier near-duplicate of text, or None after keeping text under handle."""
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        candidates = sorted({i for key in keys for i in self._buckets.get(key, ())})
+        match = next((i for i in candidates if np.mean(self.signatures[i] == signature) >= self.threshold), None)
+        if match is not None:
+            self.removed += 1
+            return match
+        for key in keys:
+            self._buckets.setdefault(key, []).append(len(self.kept))
+        self.kept.append(handle)
+        self.signatures.append(signature)
+        return None
+
+    def add(self, sections: list) -> list:
+        """Returns the sections that are not near-duplicates of a section added before, in input order.
+
+        Dropped sections are recorded in their representative's provenance, which attach_provenance()
+        copies onto the sections that make it to the output. The section dicts themselves are not modified.
+        """
+        unique = []
+        for section in sections:
+            match = self.find_or_add(_text(section), _handle(section))
+            if match is not None:
+                kept = self.kept[match]
+                self.provenance.setdefault(kept, [provenance_entry(*kept[:2])]).append(_entry(section))
+                continue
+            unique.append(section)
+        return unique
+
+    def attach_provenance(self, sections: list) -> list:
+        """Sets `provenance` on those of the given kept sections (e.g. the top-k) that absorbed near-duplicates."""
+        for section in sections:
+            merged = self.provenance.get(_handle(section))
+            if merged is not None:
+                section["provenance"] = merged
+        return sections
+
+    def summary(self):
+        return f"Deduplication: kept {len(self.kept)} sections, merged {self.removed} near-duplicates"
@@ -1,6 +1,8 @@
 import nltk
 from sentence_transformers import SentenceTransformer
 import os
+import pickle
+import importlib.util
 
 # Define the directories
 model_dir = "models"
@@ -19,11 +21,29 @@ model_path = os.path.join(model_dir, model_name)
 if not os.path.exists(model_path):
     print(f"Downloading Sentence Transformer model: '{model_name}'...")
     model = SentenceTransformer(model_name)
-    model.save(model_path)
+    model.save(model_path, safe_serialization=True)
     print(f"✅ Model saved successfully to '{model_path}'")
+elif not os.path.exists(os.path.join(model_path, "model.safetensors")):
+    # safetensors weights are memory-mapped on load instead of unpickled
+    print(f"Converting '{model_name}' weights to safetensors...")
+    SentenceTransformer(model_path).save(model_path, safe_serialization=True)
+    legacy_weights = os.path.join(model_path, "pytorch_model.bin")
+    if os.path.exists(legacy_weights):
+        os.remove(legacy_weights)
+    print(f"✅ Model weights converted in '{model_path}'")
 else:
     print(f"✅ Model '{model_name}' already exists. Skipping download.")
 
+# 1b. Export the ONNX Runtime backend (RANKER_BACKEND=onnx / onnx-int8), when requirements-onnx.txt is installed
+if os.path.exists(os.path.join(model_path, "onnx", "model_int8.onnx")):
+    print("✅ ONNX models already exported. Skipping export.")
+elif importlib.util.find_spec("onnxruntime") is None or importlib.util.find_spec("onnx") is None:
+    print("ℹ️  onnxruntime/onnx not installed (see requirements-onnx.txt). Skipping ONNX export.")
+else:
+    print("Exporting ONNX model with int8 quantization...")
+    from onnx_backend_1b import export
+    export(model_path, quantize=True)
+
 
 # 2. Download and save NLTK data
 print("\nDownloading NLTK data (punkt & stopwords)...")
@@ -41,4 +61,16 @@ except LookupError:
     nltk.download('stopwords', download_dir=nltk_dir)
     print("✅ NLTK 'stopwords' saved successfully.")
 
+# 3. Snapshot the NLTK assets so utils_1b loads them with one pickle read each
+print("\nWriting NLTK snapshot (stopwords & punkt)...")
+snapshot_dir = os.path.join(nltk_dir, "snapshot")
+os.makedirs(snapshot_dir, exist_ok=True)
+nltk.data.path.append(nltk_dir)
+from nltk.corpus import stopwords
+with open(os.path.join(snapshot_dir, "stopwords.pickle"), "wb") as f:
+    pickle.dump(frozenset(stopwords.words("english")), f, protocol=pickle.HIGHEST_PROTOCOL)
+with open(os.path.join(snapshot_dir, "punkt.pickle"), "wb") as f:
+    pickle.dump(nltk.data.load("tokenizers/punkt/english.pickle"), f, protocol=pickle.HIGHEST_PROTOCOL)
+print(f"✅ NLTK snapshot saved to '{snapshot_dir}'")
+
 print("\n--- Asset download complete! ---")
\ No newline at end of file
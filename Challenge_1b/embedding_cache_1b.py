@@ -0,0 +1,200 @@
+import os
+import json
+import time
+import hashlib
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no advisory locks, the cache is then safe for one process only
+    fcntl = None
+
+INDEX_FILE = "index.json"
+VECTORS_FILE = "vectors.npy"
+LOCK_FILE = ".lock"
+
+
+class EmbeddingCache:
+    """Persistent store of section embeddings keyed by model id + hash of the encoded text.
+
+    Vectors live in a memory-mapped float32 .npy file, so lookups read only the rows they need.
+    The key -> row table is a small JSON file that also names the vectors file. Least recently
+    used rows are dropped once the store holds more than max_entries.
+
+    Several processes may share one directory: every operation holds an fcntl lock on it and first
+    re-reads index.json if another process saved since. New rows are only appended past the saved
+    size, and growth and eviction write a new vectors file that index.json switches to atomically,
+    so the saved index never points at rows that hold other vectors.
+    """
+
+    def __init__(self, cache_dir: str, model_id: str, dim: int, max_entries: int = 200_000):
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.dim = dim
+        self.max_entries = max_entries
+        self.rows = {}      # key -> row in the vectors file
+        self.last_used = {}  # key -> logical clock of the last lookup/add
+        self.recent = set()  # keys used since the last save, re-stamped if another process's save is loaded
+        self.clock = 0
+        self.size = 0
+        self.vectors = None
+        self.vectors_file = VECTORS_FILE
+        self.stamp = None   # (inode, mtime) of the index.json this state was read from or saved as
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False  # recency or rows changed since the last save
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock_path = os.path.join(cache_dir, LOCK_FILE)
+        with self._locked():
+            self._load()
+
+    def key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock on the cache directory; reloads the store if another process saved since."""
+        with open(self._lock_path, "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            if self.stamp is not None and self._index_stamp() != self.stamp:
+                self._load()
+            yield
+
+    def _index_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.cache_dir, INDEX_FILE))
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _load(self):
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        self.vectors = None
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["dim"] != self.dim:
+                raise ValueError("embedding dimension changed")
+            self.vectors_file = index.get("vectors", VECTORS_FILE)
+            self.vectors = np.load(os.path.join(self.cache_dir, self.vectors_file), mmap_mode="r+")
+            self.rows = {key: row for key, (row, _) in index["entries"].items()}
+            self.last_used = {key: used for key, (_, used) in index["entries"].items()}
+            self.clock = max(self.clock, index["clock"])
+            self.size = index["size"]
+        except (OSError, ValueError, KeyError):
+            # Missing or incompatible store: start empty
+            self.rows, self.last_used, self.size = {}, {}, 0
+            self.vectors_file = self._new_vectors_file()
+            self.vectors = self._allocate(self.vectors_file, 1024)
+            self._write_index()
+        # Keep this process's unsaved recency on top of the store just read
+        for key in self.recent:
+            if key in self.last_used:
+                self.last_used[key] = self.clock
+        self.stamp = self._index_stamp()
+
+    @staticmethod
+    def _new_vectors_file():
+        return f"vectors.{os.getpid()}.{time.time_ns()}.npy"
+
+    def _allocate(self, name, capacity):
+        path = os.path.join(self.cache_dir, name)
+        return np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=(capacity, self.dim))
+
+    def lookup(self, keys: list):
+        """Returns (embeddings, missing): an (n, dim) array with cached rows filled in, and the indices still to encode."""
+        with self._locked():
+            self.clock += 1
+            embeddings = np.zeros((len(keys), self.dim), dtype=np.float32)
+            found, rows, missing = [], [], []
+            for i, key in enumerate(keys):
+                row = self.rows.get(key)
+                if row is None:
+                    missing.append(i)
+                else:
+                    found.append(i)
+                    rows.append(row)
+                    self.last_used[key] = self.clock
+                    self.recent.add(key)
+            if rows:
+                order = np.argsort(rows)  # sequential reads from the memory map
+                embeddings[np.asarray(found)[order]] = self.vectors[np.asarray(rows)[order]]
+        self.hits += len(found)
+        self.misses += len(missing)
+        self.dirty = self.dirty or bool(found)
+        return embeddings, missing
+
+    def add(self, keys: list, vectors: np.ndarray):
+        """Appends the vectors of keys not stored yet and saves, evicting the oldest rows past max_entries."""
+        with self._locked():
+            fresh = [(key, vec) for key, vec in zip(keys, vectors) if key not in self.rows]
+            if not fresh:
+                return
+            needed = self.size + len(fresh)
+            if needed > len(self.vectors):
+                self._rewrite(list(self.rows), max(needed, 2 * len(self.vectors)))
+            for key, vec in fresh:
+                self.vectors[self.size] = vec
+                self.rows[key] = self.size
+                self.last_used[key] = self.clock
+                self.recent.add(key)
+                self.size += 1
+            if len(self.rows) > self.max_entries:
+                self._evict()
+            self._save()
+
+    def _rewrite(self, keep, capacity):
+        """Copies the rows of keep, in that order, into a new vectors file that the next save switches to."""
+        name = self._new_vectors_file()
+        vectors = self._allocate(name, capacity)
+        kept_rows = np.asarray([self.rows[key] for key in keep], dtype=np.int64)
+        for start in range(0, len(keep), 65536):  # bounded copies, not the whole store in memory
+            chunk = kept_rows[start:start + 65536]
+            vectors[start:start + len(chunk)] = self.vectors[chunk]
+        self.rows = {key: i for i, key in enumerate(keep)}
+        self.last_used = {key: self.last_used[key] for key in keep}
+        self.size = len(keep)
+        self.vectors, self.vectors_file = vectors, name
+
+    def _evict(self):
+        """Compacts the store down to the max_entries most recently used rows."""
+        keep = sorted(self.rows, key=self.last_used.__getitem__, reverse=True)[:self.max_entries]
+        self._rewrite(keep, max(1024, len(keep)))
+
+    def _write_index(self):
+        self.vectors.flush()
+        entries = {key: [row, self.last_used[key]] for key, row in self.rows.items()}
+        index = {"model_id": self.model_id, "dim": self.dim, "clock": self.clock, "size": self.size,
+                 "vectors": self.vectors_file, "entries": entries}
+        index_path = os.path.join(self.cache_dir, INDEX_FILE)
+        with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(index_path + ".tmp", index_path)
+        # Vectors files no longer named by the index (replaced by growth or eviction) can go
+        for name in os.listdir(self.cache_dir):
+            if name.startswith("vectors") and name.endswith(".npy") and name != self.vectors_file:
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except OSError:
+                    pass
+
+    def _save(self):
+        """Call with the lock held."""
+        self._write_index()
+        self.stamp = self._index_stamp()
+        self.recent.clear()
+        self.dirty = False
+
+    def save(self):
+        with self._locked():
+            self._save()
+
+    def flush(self):
+        """Saves only if something changed, e.g. the recency of an all-hit run, which is what eviction reads."""
+        if self.dirty:
+            self.save()
+
+    def summary(self) -> str:
+        return f"Embedding cache: {self.hits} hits, {self.misses} misses, {len(self.rows)} stored"
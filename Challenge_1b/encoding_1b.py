@@ -0,0 +1,99 @@
+"""Token-budgeted section encoding shared by the torch and ONNX ranking backends.
+
+Texts are tokenized once. Anything longer than the model's max_seq_length is split into overlapping
+passages instead of being truncated. Passages are sorted by length and packed into batches of at most
+`token_budget` padded tokens, and passage embeddings are pooled back into one normalized vector per text.
+"""
+import numpy as np
+from tqdm import tqdm
+
+
+class _SentenceTransformerTokens:
+    """Token-level access to a SentenceTransformer; OnnxEncoder implements the same methods natively."""
+
+    def __init__(self, model):
+        self.model = model
+        self.max_seq_length = model.max_seq_length
+        tokenizer = model.tokenizer
+        self.special_ids = (tokenizer.cls_token_id, tokenizer.sep_token_id, tokenizer.pad_token_id)
+        self.with_token_types = "token_type_ids" in tokenizer.model_input_names
+
+    def token_ids(self, texts):
+        # verbose=False: sections longer than the model limit are expected here, they get chunked
+        return self.model.tokenizer(list(texts), add_special_tokens=False, verbose=False)["input_ids"]
+
+    def embed_ids(self, input_ids, attention_mask):
+        import torch
+        features = {"input_ids": torch.from_numpy(input_ids).to(self.model.device),
+                    "attention_mask": torch.from_numpy(attention_mask).to(self.model.device)}
+        if self.with_token_types:
+            features["token_type_ids"] = torch.zeros_like(features["input_ids"])
+        with torch.no_grad():
+            return self.model(features)["sentence_embedding"].float().cpu().numpy()
+
+
+class PassageEncoder:
+    """Encodes texts of any length into normalized float32 embeddings with minimal padding."""
+
+    def __init__(self, model, overlap=32, token_budget=8192, max_batch=128):
+        self.tokens = model if hasattr(model, "embed_ids") else _SentenceTransformerTokens(model)
+        self.dim = model.get_sentence_embedding_dimension()
+        self.window = self.tokens.max_seq_length - 2  # room for [CLS] and [SEP]
+        if not 0 <= overlap < self.window:
+            # A stride of zero or less would make plan() emit the same passage forever
+            raise ValueError(f"overlap must be in [0, {self.window}) for max_seq_length "
+                             f"{self.tokens.max_seq_length}, got {overlap}")
+        self.stride = self.window - overlap
+        self.token_budget = token_budget
+        self.max_batch = max_batch
+
+    def plan(self, texts):
+        """Tokenizes once and splits into passages: returns (passages, owners), owners[i] = index of the text."""
+        passages, owners = [], []
+        for owner, ids in enumerate(self.tokens.token_ids(texts)):
+            start = 0
+            while True:
+                passages.append(ids[start:start + self.window])
+                owners.append(owner)
+                if start + self.window >= len(ids):
+                    break
+                start += self.stride
+        return passages, owners
+
+    def batches(self, lengths):
+        """Index batches, longest first, each padding to at most token_budget tokens."""
+        order = sorted(range(len(lengths)), key=lambda i: -lengths[i])
+        batch = []
+        for i in order:
+            # The first (longest) passage sets the padded width of the batch
+            if batch and ((len(batch) + 1) * lengths[batch[0]] > self.token_budget or len(batch) == self.max_batch):
+                yield batch
+                batch = []
+            batch.append(i)
+        if batch:
+            yield batch
+
+    def encode_passages(self, passages, owners, count, show_progress_bar=False):
+        cls_id, sep_id, pad_id = self.tokens.special_ids
+        lengths = [len(p) + 2 for p in passages]
+        passage_embeddings = np.zeros((len(passages), self.dim), dtype=np.float32)
+        batches = list(self.batches(lengths))
+        for batch in tqdm(batches, desc="Batches", disable=not show_progress_bar):
+            width = lengths[batch[0]]
+            input_ids = np.full((len(batch), width), pad_id, dtype=np.int64)
+            attention_mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, i in enumerate(batch):
+                input_ids[row, :lengths[i]] = [cls_id, *passages[i], sep_id]
+                attention_mask[row, :lengths[i]] = 1
+            passage_embeddings[batch] = self.tokens.embed_ids(input_ids, attention_mask)
+
+        passage_embeddings /= np.clip(np.linalg.norm(passage_embeddings, axis=1, keepdims=True), 1e-12, None)
+        # Token-weighted mean of a text's passages; a single-passage text keeps its embedding as is
+        embeddings = np.zeros((count, self.dim), dtype=np.float32)
+        np.add.at(embeddings, np.asarray(owners), passage_embeddings * np.asarray(lengths, dtype=np.float32)[:, None])
+        embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+        return embeddings
+
+    def encode(self, texts, show_progress_bar=False):
+        passages, owners = self.plan(texts)
+        return self.encode_passages(passages, owners, len(texts), show_progress_bar)
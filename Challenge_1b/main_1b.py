@@ -1,7 +1,14 @@
 import json
 import time
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from utils_1b import SectionExtractor, RelevanceRanker, Summarizer
+from tracing_1b import span
+from vector_index_1b import SectionIndex
+from bm25_1b import BM25Index
+from dedup_1b import SectionDeduplicator
 
 # --- Configuration ---
 INPUT_JSON_PATH = "input.json"
@@ -9,78 +16,274 @@ INPUT_PDF_DIR = "input"
 OUTPUT_DIR = "output"
 OUTPUT_JSON_PATH = os.path.join(OUTPUT_DIR, "challenge1b_output.json")
 TOP_K = 5
+# Extraction process-pool size (None = one per CPU); PDFs of 2+ ranges are split into page ranges
+EXTRACTION_WORKERS = None
+PAGES_PER_RANGE = 64
+# Optional layout store (docstore_1b.py, Challenge 1A's format); a PDF is decoded once, then memory-mapped
+LAYOUT_STORE_DIR = os.environ.get("LAYOUT_STORE_DIR")
+# Optional persistent section-embedding cache (unset = off); repeat queries over the same documents skip re-encoding
+EMBEDDING_CACHE_DIR = os.environ.get("EMBEDDING_CACHE_DIR", "")
+# Optional persistent approximate-nearest-neighbour index for very large collections (unset = exact search)
+VECTOR_INDEX_PATH = os.environ.get("VECTOR_INDEX_PATH")
+# Buckets scanned per search (higher = better recall, slower) and the size at which the index stops searching exactly
+VECTOR_INDEX_NPROBE = int(os.environ.get("VECTOR_INDEX_NPROBE", "8"))
+VECTOR_INDEX_EXACT_THRESHOLD = int(os.environ.get("VECTOR_INDEX_EXACT_THRESHOLD", "20000"))
+# Encoder backend: "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime, see onnx_backend_1b.py)
+RANKER_BACKEND = os.environ.get("RANKER_BACKEND", "torch")
+# Opt-in: near-duplicate sections (dedup_1b.py) are merged before ranking; the kept one lists every source/page
+DEDUP_SECTIONS = os.environ.get("DEDUP_SECTIONS", "0") != "0"
+DEDUP_THRESHOLD = 0.8
+# Hybrid mode: only the top-N sections by BM25 (bm25_1b.py) are embedded (0 = off, rank every section)
+BM25_PREFILTER_N = int(os.environ.get("BM25_PREFILTER_N", "0"))
+# Optional persistent BM25 index, so sections seen in earlier runs are not tokenized again
+BM25_INDEX_PATH = os.environ.get("BM25_INDEX_PATH")
 
 def log(level, message):
     """Simple logger for program tracking."""
     print(f"[{time.strftime('%H:%M:%S')}] [{level.upper()}] {message}")
 
-def main():
-    """Main execution workflow for Challenge 1B."""
-    total_start_time = time.time()
-    log("start", "Persona-Driven Intelligence System Initializing...")
+class PipelineError(Exception):
+    """A fatal, user-facing error in the Challenge 1B workflow."""
 
-    # --- 1. Load and Validate Input ---
-    try:
-        with open(INPUT_JSON_PATH, "r", encoding="utf-8") as f:
-            config = json.load(f)
-        log("info", f"Loaded configuration from '{INPUT_JSON_PATH}'.")
-    except Exception as e:
-        log("fatal", f"Could not load or parse '{INPUT_JSON_PATH}': {e}")
-        return
 
-    # --- UPDATED INPUT PARSING LOGIC ---
+def parse_config(config, input_dir=INPUT_PDF_DIR):
+    """Validate an input.json payload and resolve the PDF paths it names."""
     persona_obj = config.get("persona", {})
     job_obj = config.get("job_to_be_done", {})
-    doc_objects = config.get("documents", []) # <-- CHANGE HERE: Read the 'documents' key
+    doc_objects = config.get("documents", [])
 
     persona = persona_obj.get("role")
     job_to_be_done = job_obj.get("task")
-    
+
     if not all([persona, job_to_be_done, doc_objects]):
-        log("fatal", "Input JSON is missing required fields ('documents', 'persona.role', 'job_to_be_done.task').")
-        return
+        raise PipelineError("Input JSON is missing required fields ('documents', 'persona.role', 'job_to_be_done.task').")
 
     # Extract filenames from the list of objects
-    doc_filenames = [doc.get("filename") for doc in doc_objects if doc.get("filename")] # <-- CHANGE HERE
-    pdf_paths = [os.path.join(INPUT_PDF_DIR, fname) for fname in doc_filenames]
-    
-    query = f"Persona: {persona}. Task: {job_to_be_done}"
-    log("info", f"Query: '{query}'")
+    doc_filenames = [doc.get("filename") for doc in doc_objects if doc.get("filename")]
+    pdf_paths = [os.path.join(input_dir, fname) for fname in doc_filenames]
+    return persona, job_to_be_done, doc_filenames, pdf_paths
 
-    # --- 2. Section Extraction ---
-    log("info", "--- Step 1: Kicking off Section Extraction ---")
-    t_start = time.time()
-    extractor = SectionExtractor()
-    all_sections = extractor.extract_parallel(pdf_paths)
-    if not all_sections:
-        log("fatal", "No sections could be extracted. Exiting.")
-        return
-    log("info", f"Extraction complete. Found {len(all_sections)} sections in {time.time() - t_start:.2f}s.")
 
-    # --- 3. Relevance Ranking ---
-    log("info", "--- Step 2: Starting Relevance Ranking ---")
+def parse_batch_config(config, input_dir=INPUT_PDF_DIR):
+    """Validate a multi-persona input.json ('queries' list) and resolve its PDF paths.
+
+    Returns ([(persona, job_to_be_done, output_filename), ...], doc_filenames, pdf_paths).
+    """
+    doc_objects = config.get("documents", [])
+    query_objects = config.get("queries", [])
+    if not doc_objects or not query_objects:
+        raise PipelineError("Batch input JSON is missing required fields ('documents', 'queries').")
+
+    queries = []
+    for n, query_obj in enumerate(query_objects, start=1):
+        persona = query_obj.get("persona", {}).get("role")
+        job_to_be_done = query_obj.get("job_to_be_done", {}).get("task")
+        if not all([persona, job_to_be_done]):
+            raise PipelineError(f"Query {n} is missing 'persona.role' or 'job_to_be_done.task'.")
+        # Outputs land in OUTPUT_DIR whatever path the input names
+        output_name = os.path.basename(query_obj.get("output") or f"challenge1b_output_{n}.json")
+        queries.append((persona, job_to_be_done, output_name))
+    output_names = [name for _, _, name in queries]
+    if len(set(output_names)) != len(output_names):
+        raise PipelineError("Query output filenames must be unique.")
+
+    doc_filenames = [doc.get("filename") for doc in doc_objects if doc.get("filename")]
+    pdf_paths = [os.path.join(input_dir, fname) for fname in doc_filenames]
+    return queries, doc_filenames, pdf_paths
+
+
+def load_ranker():
+    ranker = RelevanceRanker(cache_dir=EMBEDDING_CACHE_DIR or None, backend=RANKER_BACKEND)
+    ranker.load_model()
+    return ranker
+
+
+def make_deduplicator():
+    return SectionDeduplicator(DEDUP_THRESHOLD) if DEDUP_SECTIONS else None
+
+
+# Persisted indexes are loaded once per process and shared by concurrent pipelines (service_1b.py), so
+# one job's adds are never lost to another job's save; each lock guards its index's adds, searches and saves
+_lexical_lock = threading.Lock()
+_vector_lock = threading.Lock()
+_loaded_indexes = {}
+_loaded_lock = threading.Lock()
+
+
+def _shared_index(key, load):
+    with _loaded_lock:
+        if key not in _loaded_indexes:
+            _loaded_indexes[key] = load()
+        return _loaded_indexes[key]
+
+
+def load_lexical_index():
+    """The BM25 index for hybrid mode, or None when BM25_PREFILTER_N is off."""
+    if not BM25_PREFILTER_N:
+        return None
+    if not BM25_INDEX_PATH:
+        return BM25Index()
+    return _shared_index(("bm25", BM25_INDEX_PATH), lambda: BM25Index.load(BM25_INDEX_PATH))
+
+
+def lexical_indexer(lexical):
+    """extract_to_store's on_document callback: adds each finished PDF's sections to the BM25 index."""
+    if lexical is None:
+        return None
+
+    def add_sections(sections):
+        with _lexical_lock:
+            lexical.add_sections(sections)
+    return add_sections
+
+
+def save_lexical_index(lexical):
+    """Call with _lexical_lock held."""
+    if lexical is not None and BM25_INDEX_PATH:
+        lexical.save(BM25_INDEX_PATH)
+
+
+def load_vector_index(dim):
+    return _shared_index(("vector", VECTOR_INDEX_PATH, dim), lambda: SectionIndex.load(
+        VECTOR_INDEX_PATH, dim, VECTOR_INDEX_NPROBE, VECTOR_INDEX_EXACT_THRESHOLD))
+
+
+def extract_and_rank(extractor, ranker, ranker_future, pdf_paths, query, deduplicator=None):
+    """Producer/consumer pipeline: each PDF's sections are encoded as soon as that PDF is parsed.
+
+    A producer thread drains SectionExtractor.iter_completed (the parsing itself runs in worker
+    processes) into a queue; this thread waits for the model, then feeds the queue into
+    RelevanceRanker.rank_stream, which keeps only a running top-k. Returns (ranker, top_sections).
+    With a deduplicator, PDFs are released in input order so the first of a group of near-duplicates
+    is always the one kept.
+    """
+    finished = queue.Queue()
+    produced = {"sections": 0, "error": None}
     t_start = time.time()
+
+    def produce():
+        try:
+            completed, next_index = {}, 0
+            for doc_index, sections in extractor.iter_completed(pdf_paths):
+                sections = extractor.drop_empty_sections(sections)
+                produced["sections"] += len(sections)
+                if deduplicator is None:
+                    finished.put((doc_index, sections))
+                    continue
+                completed[doc_index] = sections
+                while next_index in completed:
+                    finished.put((next_index, deduplicator.add(completed.pop(next_index))))
+                    next_index += 1
+            log("info", f"Extraction complete. Found {produced['sections']} sections in {time.time() - t_start:.2f}s.")
+        except Exception as e:
+            produced["error"] = e
+        finally:
+            finished.put(None)
+
+    def batches():
+        while (item := finished.get()) is not None:
+            yield item
+
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
     try:
-        ranker = RelevanceRanker()
-        ranker.load_model()
-        top_sections = ranker.rank(all_sections, query, top_k=TOP_K)
-        log("info", f"Ranking complete. Identified top {len(top_sections)} sections in {time.time() - t_start:.2f}s.")
+        ranker = ranker or ranker_future.result()
+        top_sections = ranker.rank_stream(batches(), query, top_k=TOP_K)
     except Exception as e:
-        log("fatal", f"An error occurred during relevance ranking: {e}")
-        return
+        raise PipelineError(f"An error occurred during relevance ranking: {e}") from e
+    finally:
+        producer.join()
+
+    if produced["error"] is not None:
+        raise PipelineError(f"Section extraction failed: {produced['error']}")
+    if not produced["sections"]:
+        raise PipelineError("No sections could be extracted. Exiting.")
+    return ranker, top_sections
+
+
+def run_pipeline(config, ranker=None, input_dir=INPUT_PDF_DIR, extractor=None, summarizer=None):
+    """Run extraction, ranking and summarization for one input.json payload and return the output JSON.
+
+    Long-lived callers (see service_1b.py) pass in an already loaded ranker so the model is reused.
+    """
+    persona, job_to_be_done, doc_filenames, pdf_paths = parse_config(config, input_dir)
+
+    query = f"Persona: {persona}. Task: {job_to_be_done}"
+    log("info", f"Query: '{query}'")
+
+    extractor = extractor or SectionExtractor(EXTRACTION_WORKERS, PAGES_PER_RANGE, LAYOUT_STORE_DIR)
+    summarizer = summarizer or Summarizer()
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        # The model, then the NLTK assets, load in the background while the PDFs are being parsed
+        ranker_future = loader.submit(load_ranker) if ranker is None else None
+        loader.submit(summarizer.load_assets)
+        deduplicator = make_deduplicator()
+
+        if VECTOR_INDEX_PATH or BM25_PREFILTER_N:
+            # --- 2. Section Extraction (the BM25 index grows as each PDF completes) ---
+            log("info", "--- Step 1: Kicking off Section Extraction ---")
+            t_start = time.time()
+            lexical = load_lexical_index()
+            store = extractor.extract_to_store(pdf_paths, deduplicator, lexical_indexer(lexical))
+            if not len(store):
+                raise PipelineError("No sections could be extracted. Exiting.")
+            log("info", f"Extraction complete. Found {len(store)} sections in {time.time() - t_start:.2f}s.")
+            log("info", store.summary())
+
+            # --- 3. Relevance Ranking ---
+            log("info", "--- Step 2: Starting Relevance Ranking ---")
+            t_start = time.time()
+            try:
+                candidates = None
+                if lexical is not None:
+                    with _lexical_lock:
+                        with span("bm25_prefilter", sections=len(store)):
+                            ids = lexical.doc_ids(map(store.text, range(len(store))))
+                            candidates = lexical.prefilter(ids, query, BM25_PREFILTER_N)
+                        save_lexical_index(lexical)
+                    log("info", f"BM25 prefilter kept {len(candidates)} of {len(store)} sections.")
+                ranker = ranker or ranker_future.result()
+                if VECTOR_INDEX_PATH:
+                    index = load_vector_index(ranker.model.get_sentence_embedding_dimension())
+                    with _vector_lock:
+                        top_sections = ranker.rank_store(store, query, top_k=TOP_K, rows=candidates, index=index)
+                        index.save(VECTOR_INDEX_PATH)
+                else:
+                    top_sections = ranker.rank_store(store, query, top_k=TOP_K, rows=candidates)
+            except Exception as e:
+                raise PipelineError(f"An error occurred during relevance ranking: {e}") from e
+        else:
+            # --- 2+3. Overlapped Extraction → Relevance Ranking ---
+            log("info", "--- Steps 1-2: Streaming Section Extraction into Relevance Ranking ---")
+            t_start = time.time()
+            ranker, top_sections = extract_and_rank(extractor, ranker, ranker_future, pdf_paths, query, deduplicator)
+            if deduplicator is not None:
+                deduplicator.attach_provenance(top_sections)
+
+    log("info", f"Ranking complete. Identified top {len(top_sections)} sections in {time.time() - t_start:.2f}s.")
+    if deduplicator is not None:
+        log("info", deduplicator.summary())
+    if ranker.cache is not None:
+        ranker.save_cache()
+        log("info", ranker.cache.summary())
 
     # --- 4. Summarization ---
     log("info", "--- Step 3: Generating Summaries for Top Sections ---")
     t_start = time.time()
-    summarizer = Summarizer()
-    for section in top_sections:
-        section["refined_text"] = summarizer.summarize(section["content"])
+    with span("summarization", sections=len(top_sections)):
+        summaries = summarizer.summarize_many([section["content"] for section in top_sections])
+        for section, summary in zip(top_sections, summaries):
+            section["refined_text"] = summary
     log("info", f"Summarization complete in {time.time() - t_start:.2f}s.")
 
     # --- 5. Final Output Generation ---
     log("info", "--- Step 4: Formatting Final Output ---")
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    final_output = {
+    return build_output(doc_filenames, persona, job_to_be_done, top_sections)
+
+
+def build_output(doc_filenames, persona, job_to_be_done, top_sections):
+    """The challenge1b_output.json payload for one persona/job and its summarized top sections."""
+    return {
         "metadata": {
             "input_documents": doc_filenames, # Use the extracted list of filenames
             "persona": persona,
@@ -93,6 +296,8 @@ def main():
                 "page_number": s['page'],
                 "section_title": s['title'],
                 "importance_rank": idx + 1,
+                # Only merged sections carry the list of every document/page they were found on
+                **({"provenance": s["provenance"]} if "provenance" in s else {}),
             } for idx, s in enumerate(top_sections)
         ],
         "sub_section_analysis": [
@@ -104,12 +309,115 @@ def main():
         ]
     }
 
+
+def run_batch_pipeline(config, ranker=None, input_dir=INPUT_PDF_DIR, extractor=None, summarizer=None):
+    """Rank one document set for many persona/job queries and return [(output_filename, output JSON)].
+
+    Sections are extracted into a columnar SectionStore and encoded once, every query is scored
+    against each chunk of sections in one matrix multiply, and each section that makes any query's
+    top-k is summarized once.
+    """
+    queries, doc_filenames, pdf_paths = parse_batch_config(config, input_dir)
+    log("info", f"Batch of {len(queries)} queries over {len(pdf_paths)} documents.")
+
+    extractor = extractor or SectionExtractor(EXTRACTION_WORKERS, PAGES_PER_RANGE, LAYOUT_STORE_DIR)
+    summarizer = summarizer or Summarizer()
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        ranker_future = loader.submit(load_ranker) if ranker is None else None
+        loader.submit(summarizer.load_assets)
+
+        # --- 2. Section Extraction ---
+        log("info", "--- Step 1: Kicking off Section Extraction ---")
+        t_start = time.time()
+        lexical = load_lexical_index()
+        deduplicator = make_deduplicator()
+        store = extractor.extract_to_store(pdf_paths, deduplicator, lexical_indexer(lexical))
+        if not len(store):
+            raise PipelineError("No sections could be extracted. Exiting.")
+        log("info", f"Extraction complete. Found {len(store)} sections in {time.time() - t_start:.2f}s.")
+        log("info", store.summary())
+        if deduplicator is not None:
+            log("info", deduplicator.summary())
+
+        # --- 3. Relevance Ranking ---
+        log("info", "--- Step 2: Scoring All Queries Against the Encoded Sections ---")
+        t_start = time.time()
+        try:
+            query_texts = [f"Persona: {persona}. Task: {job}" for persona, job, _ in queries]
+            candidates = None
+            if lexical is not None:
+                with _lexical_lock:
+                    with span("bm25_prefilter", sections=len(store), queries=len(queries)):
+                        # Sections are hashed and looked up once; each query then only scores the postings
+                        ids = lexical.doc_ids(map(store.text, range(len(store))))
+                        candidates = [lexical.prefilter(ids, q, BM25_PREFILTER_N) for q in query_texts]
+                    save_lexical_index(lexical)
+                log("info", f"BM25 prefilter kept {len(set().union(*candidates))} of {len(store)} sections.")
+            ranker = ranker or ranker_future.result()
+            if VECTOR_INDEX_PATH:
+                index = load_vector_index(ranker.model.get_sentence_embedding_dimension())
+                with _vector_lock:
+                    rankings = ranker.rank_many(store, query_texts, top_k=TOP_K, candidates=candidates, index=index)
+                    index.save(VECTOR_INDEX_PATH)
+            else:
+                rankings = ranker.rank_many(store, query_texts, top_k=TOP_K, candidates=candidates)
+        except Exception as e:
+            raise PipelineError(f"An error occurred during relevance ranking: {e}") from e
+    log("info", f"Ranking complete for {len(queries)} queries in {time.time() - t_start:.2f}s.")
+    if ranker.cache is not None:
+        ranker.save_cache()
+        log("info", ranker.cache.summary())
+
+    # --- 4. Summarization (once per distinct winning section) ---
+    winners = sorted({i for ranking in rankings for i, _ in ranking})
+    log("info", f"--- Step 3: Generating Summaries for {len(winners)} Shared Top Sections ---")
+    t_start = time.time()
+    with span("summarization", sections=len(winners)):
+        summaries = dict(zip(winners, summarizer.summarize_many([store.content(i) for i in winners])))
+    log("info", f"Summarization complete in {time.time() - t_start:.2f}s.")
+
+    # --- 5. Final Output Generation ---
+    log("info", "--- Step 4: Formatting Final Outputs ---")
+    outputs = []
+    for (persona, job_to_be_done, output_name), ranking in zip(queries, rankings):
+        # Only the winning rows are materialized as section dicts
+        top_sections = [dict(store.section(i), relevance_score=score, refined_text=summaries[i]) for i, score in ranking]
+        outputs.append((output_name, build_output(doc_filenames, persona, job_to_be_done, top_sections)))
+    return outputs
+
+
+def main():
+    """Main execution workflow for Challenge 1B."""
+    total_start_time = time.time()
+    log("start", "Persona-Driven Intelligence System Initializing...")
+
+    # --- 1. Load and Validate Input ---
     try:
-        with open(OUTPUT_JSON_PATH, "w", encoding="utf-8") as f:
-            json.dump(final_output, f, indent=4)
-        log("success", f"Processing complete. Output saved to '{OUTPUT_JSON_PATH}'.")
+        with open(INPUT_JSON_PATH, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        log("info", f"Loaded configuration from '{INPUT_JSON_PATH}'.")
     except Exception as e:
-        log("fatal", f"Failed to write output file: {e}")
+        log("fatal", f"Could not load or parse '{INPUT_JSON_PATH}': {e}")
+        return
+
+    try:
+        if "queries" in config:
+            outputs = run_batch_pipeline(config)
+        else:
+            outputs = [(os.path.basename(OUTPUT_JSON_PATH), run_pipeline(config))]
+    except PipelineError as e:
+        log("fatal", str(e))
+        return
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    for output_name, final_output in outputs:
+        output_path = os.path.join(OUTPUT_DIR, output_name)
+        try:
+            with span("json_write"), open(output_path, "w", encoding="utf-8") as f:
+                json.dump(final_output, f, indent=4)
+            log("success", f"Processing complete. Output saved to '{output_path}'.")
+        except Exception as e:
+            log("fatal", f"Failed to write output file: {e}")
         
     log("end", f"Total execution time: {time.time() - total_start_time:.2f} seconds.")
 
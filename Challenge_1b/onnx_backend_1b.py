@@ -0,0 +1,172 @@
+"""ONNX Runtime encoder for the bundled sentence-transformer, with optional int8 dynamic quantization.
+
+    python onnx_backend_1b.py export [--quantize]   # writes <model>/onnx/model.onnx (+ model_int8.onnx)
+    python onnx_backend_1b.py check [--quantize]    # parity and speed against the torch embeddings,
+                                                    # both through encoding_1b.PassageEncoder as ranking uses them
+
+Only onnxruntime, tokenizers and numpy are needed at inference time; export and check also need torch.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import argparse
+
+import numpy as np
+
+DEFAULT_MODEL_PATH = './models/all-MiniLM-L6-v2'
+ONNX_FILES = {"onnx": "model.onnx", "onnx-int8": "model_int8.onnx"}
+# Minimum per-text cosine between torch and ONNX embeddings for `check` to pass
+PARITY_THRESHOLDS = {"onnx": 0.9999, "onnx-int8": 0.98}
+
+PARITY_TEXTS = [
+    "Persona: Travel Planner. Task: Plan a trip of 4 days for a group of 10 college friends.",
+    "Comprehensive Guide to Major Cities in the South of France. Marseille, Nice and Avignon each offer a distinct mix of history, food and nightlife.",
+    "Coastal Adventures. The Mediterranean coastline is dotted with beaches, coves and clifftop trails.",
+    "Create and manage fillable forms. Use the Prepare Form tool to detect fields automatically.",
+    "Vegetarian buffet menu. Falafel, hummus, roasted vegetables and a gluten-free quinoa salad.",
+    "Introduction",
+    "",
+    " ".join(["A very long section body that runs past the model's maximum sequence length."] * 40),
+]
+
+
+def onnx_path(model_path, backend):
+    return os.path.join(model_path, "onnx", ONNX_FILES[backend])
+
+
+class OnnxEncoder:
+    """Token-level model access for encoding_1b.PassageEncoder, backed by ONNX Runtime.
+
+    Tokenizes with the model's tokenizer.json and mean-pools over the attention mask as
+    1_Pooling/config.json specifies. token_ids, special_ids and embed_ids are what PassageEncoder
+    uses on torch too; max_seq_length comes from sentence_bert_config.json.
+    """
+
+    def __init__(self, model_path=DEFAULT_MODEL_PATH, backend="onnx", threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_path, "1_Pooling", "config.json"), encoding="utf-8") as f:
+            pooling = json.load(f)
+        if not pooling.get("pooling_mode_mean_tokens"):
+            raise ValueError(f"Only mean pooling is supported, '{model_path}' uses {pooling}.")
+        self.dim = pooling["word_embedding_dimension"]
+        with open(os.path.join(model_path, "sentence_bert_config.json"), encoding="utf-8") as f:
+            self.max_seq_length = json.load(f)["max_seq_length"]
+
+        # Passages are cut and padded by encoding_1b.PassageEncoder, so the tokenizer does neither
+        self._raw_tokenizer = Tokenizer.from_file(os.path.join(model_path, "tokenizer.json"))
+        self._raw_tokenizer.no_padding()
+        self._raw_tokenizer.no_truncation()
+        self.special_ids = tuple(self._raw_tokenizer.token_to_id(t) for t in ("[CLS]", "[SEP]", "[PAD]"))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        path = onnx_path(model_path, backend)
+        if not os.path.exists(path):
+            raise IOError(f"No ONNX model at '{path}'. Run `python onnx_backend_1b.py export` first.")
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def token_ids(self, texts):
+        """Token ids without special tokens or truncation."""
+        return [e.ids for e in self._raw_tokenizer.encode_batch(list(texts), add_special_tokens=False)]
+
+    def embed_ids(self, input_ids, attention_mask):
+        """Mean-pooled (unnormalized) embeddings for a padded batch of token ids."""
+        feed = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": np.zeros_like(input_ids)}
+        token_embeddings = self.session.run(None, {k: v for k, v in feed.items() if k in self.input_names})[0]
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+def export(model_path=DEFAULT_MODEL_PATH, quantize=False):
+    """Exports the transformer (token embeddings) to ONNX; pooling runs in NumPy in OnnxEncoder."""
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    model = SentenceTransformer(model_path, device="cpu")
+    transformer = model[0].auto_model.eval()
+    os.makedirs(os.path.join(model_path, "onnx"), exist_ok=True)
+    fp32_path = onnx_path(model_path, "onnx")
+
+    sample = model.tokenize(["An example sentence to trace the graph."])
+    names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+
+    class TokenEmbeddings(torch.nn.Module):
+        # Inputs go in by name: forward()'s positional order differs across transformers versions
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, *inputs):
+            return self.transformer(**dict(zip(names, inputs)), return_dict=False)[0]
+
+    axes = {name: {0: "batch", 1: "sequence"} for name in names}
+    axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    # Newer torch defaults to the dynamo exporter (needs onnxscript); keep the TorchScript one
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(TokenEmbeddings(), tuple(sample[name] for name in names), fp32_path,
+                          input_names=names, output_names=["last_hidden_state"], dynamic_axes=axes,
+                          opset_version=17, **legacy)
+    print(f"✅ Exported '{fp32_path}'")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        int8_path = onnx_path(model_path, "onnx-int8")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"✅ Quantized '{int8_path}'")
+
+
+def check(model_path=DEFAULT_MODEL_PATH, backend="onnx", texts=PARITY_TEXTS, repeat=20):
+    """Compares ONNX to torch embeddings text by text; returns True when every cosine clears the threshold.
+
+    Both go through PassageEncoder, the path RelevanceRanker ranks with, so texts past max_seq_length
+    are compared as pooled passages rather than truncated.
+    """
+    from sentence_transformers import SentenceTransformer
+    from encoding_1b import PassageEncoder
+
+    reference_encoder = PassageEncoder(SentenceTransformer(model_path, device="cpu"))
+    encoder = PassageEncoder(OnnxEncoder(model_path, backend))
+    reference = reference_encoder.encode(texts)
+    candidate = encoder.encode(texts)
+    cosines = (reference * candidate).sum(axis=1)
+    print(f"{backend}: min cosine {cosines.min():.6f}, max abs diff {np.abs(reference - candidate).max():.2e}")
+
+    batch = texts * repeat
+    for name, passage_encoder in (("torch", reference_encoder), (backend, encoder)):
+        passage_encoder.encode(texts)  # warm-up
+        t_start = time.time()
+        passage_encoder.encode(batch)
+        print(f"{name}: {len(batch) / (time.time() - t_start):.1f} texts/s")
+
+    passed = bool(cosines.min() >= PARITY_THRESHOLDS[backend])
+    print("✅ Parity OK" if passed else f"❌ Parity below {PARITY_THRESHOLDS[backend]}")
+    return passed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export and check the ONNX Runtime ranking backend.")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    parser.add_argument("--quantize", action="store_true", help="also build / check the int8 model")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export(args.model_path, args.quantize)
+        return 0
+    backends = ["onnx", "onnx-int8"] if args.quantize else ["onnx"]
+    return 0 if all([check(args.model_path, backend) for backend in backends]) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+"""Columnar in-memory store of extracted sections for large collections.
+
+Instead of one dict per section, documents are interned to int ids, pages sit in an int array and every
+title and content is appended to one contiguous UTF-8 buffer addressed by byte offsets. Ranking writes
+float32 scores into a column. Only the winning rows are turned back into section dicts for the output.
+"""
+from array import array
+
+import numpy as np
+
+
+def provenance_entry(source, page):
+    return {"document": source, "page_number": page}
+
+
+class SectionStore:
+    """Append-only section table: row i is document doc_names[doc[i]], page page[i], title(i), content(i)."""
+
+    def __init__(self):
+        self.doc_names = []
+        self._doc_ids = {}
+        self.doc = array("i")
+        self.page = array("i")
+        # Row i's title is _text[offsets[2i]:offsets[2i+1]], its content runs on to offsets[2i+2]
+        self.offsets = array("q", [0])
+        self._text = bytearray()
+        self.scores = np.zeros(0, dtype=np.float32)
+        self.provenance = {}  # row -> [{"document", "page_number"}, ...] for rows that absorbed near-duplicates
+
+    def __len__(self):
+        return len(self.doc)
+
+    def append(self, section: dict) -> int:
+        """Stores a section dict as a new row and returns the row number."""
+        source = section["source"]
+        doc_id = self._doc_ids.get(source)
+        if doc_id is None:
+            doc_id = self._doc_ids[source] = len(self.doc_names)
+            self.doc_names.append(source)
+        self.doc.append(doc_id)
+        self.page.append(section["page"])
+        for field in ("title", "content"):
+            self._text += section.get(field, "").encode("utf-8")
+            self.offsets.append(len(self._text))
+        return len(self.doc) - 1
+
+    def extend(self, sections: list, deduplicator=None):
+        """Appends sections in order; with a SectionDeduplicator, near-duplicates of earlier rows only
+        extend that row's provenance."""
+        for section in sections:
+            if deduplicator is not None:
+                text = f"{section.get('title', '')}. {section.get('content', '')}"
+                match = deduplicator.find_or_add(text, len(self))
+                if match is not None:
+                    row = deduplicator.kept[match]
+                    self.provenance.setdefault(row, [provenance_entry(*self.location(row))]).append(
+                        provenance_entry(section["source"], section["page"]))
+                    continue
+            self.append(section)
+
+    def _decode(self, lo, hi):
+        return self._text[self.offsets[lo]:self.offsets[hi]].decode("utf-8")
+
+    def title(self, row: int) -> str:
+        return self._decode(2 * row, 2 * row + 1)
+
+    def content(self, row: int) -> str:
+        return self._decode(2 * row + 1, 2 * row + 2)
+
+    def location(self, row: int):
+        """(source filename, page number) of a row."""
+        return self.doc_names[self.doc[row]], self.page[row]
+
+    def text(self, row: int) -> str:
+        """The 'title. content' text the ranker embeds, as RelevanceRanker.section_text builds it."""
+        return f"{self.title(row)}. {self.content(row)}"
+
+    def texts(self, rows=None) -> list:
+        return [self.text(row) for row in (range(len(self)) if rows is None else rows)]
+
+    def reset_scores(self):
+        self.scores = np.full(len(self), np.nan, dtype=np.float32)
+
+    def section(self, row: int) -> dict:
+        """Row materialized as the section dict the rest of the pipeline uses."""
+        source, page = self.location(row)
+        section = {"title": self.title(row), "content": self.content(row), "source": source, "page": page}
+        if row in self.provenance:
+            section["provenance"] = self.provenance[row]
+        return section
+
+    def nbytes(self) -> int:
+        return (len(self._text) + self.doc.itemsize * len(self.doc) + self.page.itemsize * len(self.page)
+                + self.offsets.itemsize * len(self.offsets) + self.scores.nbytes)
+
+    def summary(self):
+        return (f"Section store: {len(self)} sections from {len(self.doc_names)} documents "
+                f"in {self.nbytes() / 2**20:.1f} MiB")
@@ -0,0 +1,107 @@
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from main_1b import INPUT_PDF_DIR, LAYOUT_STORE_DIR, PipelineError, load_ranker, log, run_pipeline
+from utils_1b import SectionExtractor, Summarizer
+
+DEFAULT_PORT = 8012
+
+
+class RankingService:
+    """Keeps the sentence-transformer loaded and runs persona-ranking jobs on a warm thread pool."""
+
+    def __init__(self, workers=2):
+        self.workers = workers
+        self.ranker = load_ranker()
+        self.extractor = SectionExtractor(store_dir=LAYOUT_STORE_DIR)
+        self.summarizer = Summarizer()
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def rank(self, config):
+        input_dir = config.get("input_dir", INPUT_PDF_DIR)
+        return self.executor.submit(run_pipeline, config, self.ranker, input_dir,
+                                    self.extractor, self.summarizer).result()
+
+    def shutdown(self):
+        self.executor.shutdown()
+        self.extractor.close()
+        self.summarizer.close()
+
+
+def _is_valid_config(config):
+    """Shape check for a /rank body, so malformed input is a 400 rather than an AttributeError in run_pipeline."""
+    if not isinstance(config, dict):
+        return False
+    if not all(isinstance(config.get(field, {}), dict) for field in ("persona", "job_to_be_done")):
+        return False
+    documents = config.get("documents", [])
+    if not isinstance(documents, list) or not all(isinstance(doc, dict) for doc in documents):
+        return False
+    return isinstance(config.get("input_dir", INPUT_PDF_DIR), str)
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, payload):
+            body = json.dumps(payload, indent=4).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "ok", "workers": service.workers})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/rank":
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                config = json.loads(self.rfile.read(length) or b"{}")
+                if not _is_valid_config(config):
+                    raise ValueError("bad request")
+            except ValueError:
+                self._send(400, {"error": "body must be an input.json-style JSON object"})
+                return
+            try:
+                self._send(200, service.rank(config))
+            except PipelineError as e:
+                self._send(422, {"error": str(e)})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass  # run_pipeline already logs each stage
+
+    return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve persona-driven ranking over localhost HTTP.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=2, help="concurrent ranking jobs")
+    args = parser.parse_args(argv)
+
+    log("start", "Loading model for ranking service...")
+    service = RankingService(args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    log("info", f"Ranking service ready on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,112 @@
 import fitz  # PyMuPDF
 import re
 import os
-from concurrent.futures import ThreadPoolExecutor
-from sentence_transformers import SentenceTransformer, util
-import nltk
-from collections import defaultdict
-from tqdm import tqdm
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+import heapq
+import hashlib
+import pickle
+import threading
+import multiprocessing
+import numpy as np
+
+import tracing_1b
+from tracing_1b import span
+from embedding_cache_1b import EmbeddingCache
+from vector_index_1b import top_k_indices
+from docstore_1b import DocumentLayout, LayoutStore
+from sections_1b import SectionStore
 
 # --- NLTK Setup ---
-try:
-    nltk.data.path.append('./nltk_data')
-    from nltk.corpus import stopwords
+# nltk, sentence_transformers/torch and tqdm are imported at first use, so paths that only extract
+# sections never pay for them. download_assets.py pickles the stopword set and the punkt tokenizer
+# into NLTK_SNAPSHOT_DIR; the stopwords then load without importing nltk at all.
+NLTK_DATA_DIR = './nltk_data'
+NLTK_SNAPSHOT_DIR = os.path.join(NLTK_DATA_DIR, 'snapshot')
+
+def progress_bar(**kwargs):
+    """One tqdm bar for a whole run, shown only on a terminal so service and piped logs stay clean."""
+    from tqdm import tqdm
+    return tqdm(disable=not sys.stderr.isatty(), **kwargs)
+
+@lru_cache(maxsize=None)
+def load_stopwords():
+    try:
+        with open(os.path.join(NLTK_SNAPSHOT_DIR, 'stopwords.pickle'), 'rb') as f:
+            return pickle.load(f)
+    except OSError:
+        pass
+    try:
+        import nltk
+        nltk.data.path.append(NLTK_DATA_DIR)
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words("english"))
+    except Exception as e:
+        print(f"[CRITICAL_ERROR] Failed to load NLTK data: {e}")
+        return frozenset()
+
+@lru_cache(maxsize=None)
+def load_tokenizers():
+    """(sent_tokenize, word_tokenize), with the snapshot's punkt tokenizer when there is one."""
+    import nltk
+    nltk.data.path.append(NLTK_DATA_DIR)
     from nltk.tokenize import word_tokenize, sent_tokenize
-    STOPWORDS = set(stopwords.words("english"))
-except Exception as e:
-    print(f"[CRITICAL_ERROR] Failed to load NLTK data: {e}")
-    STOPWORDS = set()
+    try:
+        with open(os.path.join(NLTK_SNAPSHOT_DIR, 'punkt.pickle'), 'rb') as f:
+            sent_tokenize = pickle.load(f).tokenize
+    except OSError:
+        pass
+    return sent_tokenize, word_tokenize
+
+def __getattr__(name):
+    # utils_1b.STOPWORDS keeps working for importers without loading the corpus at import time
+    if name == "STOPWORDS":
+        return load_stopwords()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _pool_context():
+    """forkserver (spawn where unavailable) for the process pools: main_1b loads the model on a thread
+    while PDFs are parsed, and forking while that thread holds an import or OpenMP lock can deadlock."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+def _warm_pool(owner, size=None):
+    """owner's cached process pool of at least min(size, owner.workers) workers, started on first use.
+
+    A pool started smaller for an earlier, smaller job is replaced by a larger one; the old pool
+    finishes the work already submitted to it.
+    """
+    size = min(size or owner.workers, owner.workers)
+    with owner._executor_lock:
+        if owner._executor is not None and owner._executor_size < size:
+            owner._executor.shutdown(wait=False)
+            owner._executor = None
+        if owner._executor is None:
+            owner._executor = ProcessPoolExecutor(max_workers=size, mp_context=_pool_context())
+            owner._executor_size = size
+        return owner._executor
+
+def _restart_pool(owner, broken):
+    """Drops a pool broken by a dead worker (segfault, OOM killer); the next _warm_pool starts a fresh one.
+
+    Concurrent jobs that saw the same pool break replace it once.
+    """
+    with owner._executor_lock:
+        if owner._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            owner._executor = None
+
+def _submit(owner, size, fn, *args):
+    """(executor, future) for fn(*args) on owner's pool (see _warm_pool), replacing a pool another job left broken."""
+    executor = _warm_pool(owner, size)
+    try:
+        return executor, executor.submit(fn, *args)
+    except BrokenProcessPool:
+        _restart_pool(owner, executor)
+        executor = _warm_pool(owner, size)
+        return executor, executor.submit(fn, *args)
 
 def _clean_text(text):
     """A dedicated function to clean text artifacts from PDF extraction."""
@@ -52,100 +143,560 @@ class SectionExtractor:
 
         return True
 
-    def _extract_from_single_pdf(self, pdf_path: str) -> list:
-        doc_name = os.path.basename(pdf_path)
-        sections = []
-        try:
-            doc = fitz.open(pdf_path)
-            current_heading = "Introduction"
-            current_content = []
-            heading_page = 1
-
-            for page_num, page in enumerate(doc, 1):
-                # Using 'blocks' gives us paragraphs separated by layout.
-                blocks = page.get_text("blocks")
+    def __init__(self, workers: int = None, pages_per_range: int = 64, store_dir: str = None):
+        # Process-pool size (None = one per CPU, 1 = serial in this process). Documents of at least
+        # two page ranges are split so a single huge PDF also spreads across the pool.
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_range = pages_per_range
+        # Optional layout store (docstore_1b.py): each PDF is decoded once, then memory-mapped
+        self.store_dir = store_dir
+        self._executor = None
+        self._executor_size = 0
+        self._executor_lock = threading.Lock()
+
+    def _scan_pages(self, doc, start: int, stop: int) -> list:
+        """Returns (page_num, block_text, is_heading) for every non-empty block on pages [start, stop)."""
+        with span("get_text", pages=stop - start):
+            # Using 'blocks' gives us paragraphs separated by layout.
+            if isinstance(doc, DocumentLayout):
+                page_blocks = [doc.page_blocks(n) for n in range(start, stop)]
+            else:
+                page_blocks = [doc[n].get_text("blocks") for n in range(start, stop)]
+
+        scanned = []
+        with span("block_classification") as s:
+            for page_num, blocks in enumerate(page_blocks, start + 1):
                 for block in blocks:
                     # block[4] contains the text content of the block
                     block_text = _clean_text(block[4])
-                    if not block_text:
-                        continue
-
-                    # Apply our layout-based heading detection
-                    if self._is_heading_by_layout(block_text):
-                        if current_content:
-                            sections.append({
-                                "title": current_heading,
-                                "content": " ".join(current_content),
-                                "source": doc_name, "page": heading_page
-                            })
-                        
-                        # Start a new section
-                        current_heading = block_text
-                        current_content = []
-                        heading_page = page_num
-                    else:
-                        current_content.append(block_text)
-            
+                    if block_text:
+                        # Apply our layout-based heading detection
+                        scanned.append((page_num, block_text, self._is_heading_by_layout(block_text)))
+            s.count(blocks=len(scanned))
+        return scanned
+
+    def _assemble_sections(self, scanned: list, doc_name: str) -> list:
+        """Groups scanned blocks into sections; the heading carry-over is the same however pages were scanned."""
+        sections = []
+        current_heading = "Introduction"
+        current_content = []
+        heading_page = 1
+
+        with span("section_assembly") as s:
+            for page_num, block_text, is_heading in scanned:
+                if is_heading:
+                    if current_content:
+                        sections.append({
+                            "title": current_heading,
+                            "content": " ".join(current_content),
+                            "source": doc_name, "page": heading_page
+                        })
+
+                    # Start a new section
+                    current_heading = block_text
+                    current_content = []
+                    heading_page = page_num
+                else:
+                    current_content.append(block_text)
+
             # Add the last section after the loop finishes
             if current_content:
                 sections.append({
                     "title": current_heading, "content": " ".join(current_content),
                     "source": doc_name, "page": heading_page
                 })
-            
-            return sections
+            s.count(sections=len(sections))
+        return sections
+
+    def _extract_from_single_pdf(self, pdf_path: str) -> list:
+        doc_name = os.path.basename(pdf_path)
+        try:
+            with span("pdf_open"):
+                doc = self._open(pdf_path)
+            with doc:
+                scanned = self._scan_pages(doc, 0, len(doc))
+            return self._assemble_sections(scanned, doc_name)
         except Exception as e:
             print(f"  [ERROR] Could not process {doc_name}: {e}")
             return []
 
-    def extract_parallel(self, pdf_paths: list) -> list:
-        max_workers = min(4, os.cpu_count() or 1)
-        sections = []
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            with tqdm(total=len(pdf_paths), desc="Extracting Sections") as pbar:
-                futures = {executor.submit(self._extract_from_single_pdf, path): path for path in pdf_paths}
-                for future in futures:
-                    result = future.result()
-                    # Filter out empty "Introduction" sections if they have no real content
-                    for section in result:
-                        if section['title'] == 'Introduction' and not section['content'].strip():
-                            continue
-                        sections.append(section)
-                    pbar.update(1)
-        return sections
+    def _open(self, pdf_path: str):
+        if self.store_dir:
+            return LayoutStore(self.store_dir).open(pdf_path)
+        return fitz.open(pdf_path)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _page_ranges(self, page_count: int) -> list:
+        if page_count < 2 * self.pages_per_range:
+            return [(0, page_count)]
+        return [(start, min(start + self.pages_per_range, page_count))
+                for start in range(0, page_count, self.pages_per_range)]
+
+    def iter_completed(self, pdf_paths: list):
+        """Yields (doc_index, sections) as each document finishes, in completion order.
+
+        Page ranges of every document are scanned on the process pool and consumed as they complete,
+        so one slow PDF doesn't hold up the others; a document's sections are assembled as soon as
+        all of its ranges are in. The pool is sized to the number of ranges (up to self.workers), and
+        a job of a single range is scanned in this process without starting one.
+        """
+        if self.workers <= 1:
+            for doc_index, path in enumerate(pdf_paths):
+                yield doc_index, self._extract_from_single_pdf(path)
+            return
+
+        ranges_of = {}
+        for doc_index, path in enumerate(pdf_paths):
+            try:
+                if self.store_dir:
+                    # A stored layout is cheap to read: one worker builds or maps the whole document
+                    ranges_of[doc_index] = [(0, None)]
+                else:
+                    with fitz.open(path) as doc:
+                        ranges_of[doc_index] = self._page_ranges(len(doc))
+            except Exception as e:
+                print(f"  [ERROR] Could not process {os.path.basename(path)}: {e}")
+                yield doc_index, []
+        units = sum(len(ranges) for ranges in ranges_of.values())
+        if units < 2:
+            for doc_index in ranges_of:
+                yield doc_index, self._extract_from_single_pdf(pdf_paths[doc_index])
+            return
+
+        # The pool is kept warm between calls so long-lived callers (service_1b.py) don't respawn workers per job
+        futures = {}
+        parts = {}
+        for doc_index, ranges in ranges_of.items():
+            path = pdf_paths[doc_index]
+            parts[doc_index] = [None] * len(ranges)
+            for range_index, (start, stop) in enumerate(ranges):
+                executor, future = _submit(self, units, _scan_pdf_range, path, start, stop, self.store_dir)
+                futures[future] = (executor, doc_index, range_index)
+
+        remaining = {doc_index: len(chunks) for doc_index, chunks in parts.items()}
+        failed = set()
+        suspects = set()  # had a range in flight when a worker died: retried alone below
+        for future in as_completed(futures):
+            executor, doc_index, range_index = futures[future]
+            doc_name = os.path.basename(pdf_paths[doc_index])
+            try:
+                parts[doc_index][range_index] = future.result()
+            except BrokenProcessPool:
+                _restart_pool(self, executor)
+                suspects.add(doc_index)
+            except Exception as e:
+                if doc_index not in failed:
+                    print(f"  [ERROR] Could not process {doc_name}: {e}")
+                failed.add(doc_index)
+            remaining[doc_index] -= 1
+            if remaining[doc_index] == 0 and doc_index not in suspects:
+                chunks = parts.pop(doc_index)
+                if doc_index in failed:
+                    yield doc_index, []
+                else:
+                    yield doc_index, self._assemble_sections([b for chunk in chunks for b in chunk], doc_name)
+
+        # Every document that lost a range to a crash is rescanned alone on a fresh pool, so only one
+        # that crashes it again is reported as crashed
+        for doc_index in sorted(suspects):
+            chunks = parts.pop(doc_index)
+            doc_name = os.path.basename(pdf_paths[doc_index])
+            if doc_index in failed:
+                yield doc_index, []
+                continue
+            path, retry = pdf_paths[doc_index], {}
+            for range_index, (start, stop) in enumerate(ranges_of[doc_index]):
+                if chunks[range_index] is None:
+                    retry[range_index] = _submit(self, units, _scan_pdf_range, path, start, stop, self.store_dir)
+            try:
+                for range_index, (executor, future) in retry.items():
+                    chunks[range_index] = future.result()
+            except BrokenProcessPool:
+                _restart_pool(self, executor)
+                print(f"  [ERROR] Could not process {doc_name}: worker crashed")
+                yield doc_index, []
+            except Exception as e:
+                print(f"  [ERROR] Could not process {doc_name}: {e}")
+                yield doc_index, []
+            else:
+                yield doc_index, self._assemble_sections([b for chunk in chunks for b in chunk], doc_name)
+
+    def extract_parallel(self, pdf_paths: list, on_document=None) -> list:
+        """All sections in input order; on_document(sections) is called as each PDF completes."""
+        results = [None] * len(pdf_paths)
+        with progress_bar(total=len(pdf_paths), desc="Extracting Sections") as pbar:
+            for doc_index, result in self.iter_completed(pdf_paths):
+                results[doc_index] = result
+                if on_document is not None:
+                    on_document(self.drop_empty_sections(result))
+                pbar.update(1)
+
+        # Collected in completion order, returned in input order
+        return [section for result in results for section in self.drop_empty_sections(result)]
+
+    def extract_to_store(self, pdf_paths: list, deduplicator=None, on_document=None) -> SectionStore:
+        """Like extract_parallel, but into a columnar SectionStore, optionally merging near-duplicates.
+
+        Documents are appended in input order as they complete (one that finishes early waits for
+        those before it), so section dicts only live until their document is stored.
+        """
+        store = SectionStore()
+        completed, next_index = {}, 0
+        with progress_bar(total=len(pdf_paths), desc="Extracting Sections") as pbar:
+            for doc_index, result in self.iter_completed(pdf_paths):
+                completed[doc_index] = self.drop_empty_sections(result)
+                if on_document is not None:
+                    on_document(completed[doc_index])
+                while next_index in completed:
+                    store.extend(completed.pop(next_index), deduplicator)
+                    next_index += 1
+                pbar.update(1)
+        return store
+
+    @staticmethod
+    def drop_empty_sections(sections: list) -> list:
+        # Filter out empty "Introduction" sections if they have no real content
+        return [s for s in sections if not (s['title'] == 'Introduction' and not s['content'].strip())]
+
+def _scan_pdf_range(pdf_path: str, start: int, stop: int, store_dir: str = None) -> list:
+    """Process-pool entry point for SectionExtractor.iter_completed: compact (page, text, is_heading) tuples.
+
+    stop=None scans to the last page.
+    """
+    extractor = SectionExtractor(store_dir=store_dir)
+    try:
+        with span("pdf_open"):
+            doc = extractor._open(pdf_path)
+        with doc:
+            return extractor._scan_pages(doc, start, len(doc) if stop is None else stop)
+    finally:
+        tracing_1b.flush()  # pool workers exit without running atexit hooks
 
 class RelevanceRanker:
-    def __init__(self, model_path='./models/all-MiniLM-L6-v2'):
+    def __init__(self, model_path='./models/all-MiniLM-L6-v2', cache_dir=None, cache_max_entries=200_000, backend="torch"):
         self.model_path = model_path
         self.model = None
+        self.encoder = None
+        # "torch" (SentenceTransformer), "onnx" or "onnx-int8" (ONNX Runtime, see onnx_backend_1b.py)
+        self.backend = backend
+        model_name = os.path.basename(os.path.normpath(model_path))
+        self.model_id = model_name if backend == "torch" else f"{model_name}-{backend}"
+        # Optional persistent embedding store; only cache misses are sent to the model
+        self.cache_dir = cache_dir
+        self.cache_max_entries = cache_max_entries
+        self.cache = None
+        self._cache_lock = threading.Lock()
     def load_model(self):
-        try: self.model = SentenceTransformer(self.model_path)
-        except Exception as e: raise IOError(f"Could not load model from '{self.model_path}'.")
-    def rank(self, sections, query, top_k):
+        from encoding_1b import PassageEncoder
+        try:
+            if self.backend == "torch":
+                from sentence_transformers import SentenceTransformer
+                self.model = SentenceTransformer(self.model_path)
+            else:
+                from onnx_backend_1b import OnnxEncoder
+                self.model = OnnxEncoder(self.model_path, self.backend)
+        except Exception as e: raise IOError(f"Could not load {self.backend} model from '{self.model_path}': {e}")
+        if self.cache_dir:
+            dim = self.model.get_sentence_embedding_dimension()
+            try:
+                self.cache = EmbeddingCache(self.cache_dir, self.model_id, dim, self.cache_max_entries)
+            except OSError as e:
+                # e.g. a read-only image: rank without the cache rather than fail the run
+                print(f"  [WARNING] Embedding cache disabled, could not open '{self.cache_dir}': {e}")
+        self.encoder = PassageEncoder(self.model)
+    def _encode(self, texts, show_progress_bar=False):
+        """Normalized float32 embeddings, one row per text; long texts are pooled over overlapping passages.
+
+        Chunked and streaming callers encode many times per run, so only single-shot ones ask for a bar.
+        """
+        with span("embedding_encode", sections=len(texts)) as s:
+            passages, owners = self.encoder.plan(texts)
+            s.count(passages=len(passages), tokens=sum(len(p) + 2 for p in passages))
+            return self.encoder.encode_passages(passages, owners, len(texts), show_progress_bar)
+    @staticmethod
+    def section_text(section):
+        return f"{section.get('title', '')}. {section.get('content', '')}"
+    def section_key(self, text):
+        """Content hash identifying a section's embedding in the cache and the vector index."""
+        if self.cache is not None:
+            return self.cache.key(text)
+        return hashlib.sha1(f"{self.model_id}\0{text}".encode("utf-8")).hexdigest()
+    @staticmethod
+    def section_texts(sections, rows):
+        """'title. content' texts of the given rows of a section list or SectionStore."""
+        if isinstance(sections, SectionStore):
+            return sections.texts(rows)
+        return [RelevanceRanker.section_text(sections[i]) for i in rows]
+    def encode_sections(self, sections, show_progress_bar=False):
+        """Embeds each section's 'title. content' text, serving unchanged sections from the cache."""
+        return self.encode_texts([self.section_text(sec) for sec in sections], show_progress_bar)
+    def encode_texts(self, section_contents, show_progress_bar=False):
+        if self.cache is None:
+            return self._encode(section_contents, show_progress_bar)
+        keys = [self.cache.key(text) for text in section_contents]
+        with self._cache_lock:
+            embeddings, missing = self.cache.lookup(keys)
+        if missing:
+            # Encoded without the lock, so concurrent jobs (service_1b.py) don't wait on each other's model calls
+            fresh = self._encode([section_contents[i] for i in missing], show_progress_bar)
+            embeddings[missing] = fresh
+            with self._cache_lock:
+                try:
+                    self.cache.add([keys[i] for i in missing], fresh)  # saved as it is added; keys stored meanwhile are skipped
+                except OSError as e:
+                    print(f"  [WARNING] Could not store embeddings in the cache: {e}")
+        return embeddings
+    def save_cache(self):
+        """Persists the cache's lookup recency too; encode_texts only saves when it adds embeddings."""
+        if self.cache is not None:
+            with self._cache_lock:
+                try:
+                    self.cache.flush()
+                except OSError as e:
+                    print(f"  [WARNING] Could not save the embedding cache: {e}")
+    def rank(self, sections, query, top_k, index=None):
+        """Top-k sections by cosine similarity to the query, best first.
+
+        With a SectionIndex, sections missing from it are embedded and added, and candidates come from
+        an approximate search instead of scoring every section.
+        """
         if not self.model: raise RuntimeError("Model not loaded.")
         if not sections: return []
-        section_contents = [f"{sec.get('title', '')}. {sec.get('content', '')}" for sec in sections]
-        section_embeddings = self.model.encode(section_contents, convert_to_tensor=True, show_progress_bar=True)
-        query_embedding = self.model.encode(query, convert_to_tensor=True)
-        cosine_scores = util.cos_sim(query_embedding, section_embeddings)[0]
-        for i, section in enumerate(sections):
-            section['relevance_score'] = round(cosine_scores[i].item(), 4)
-        return sorted(sections, key=lambda x: x['relevance_score'], reverse=True)[:top_k]
+        query_embedding = self._encode([query])[0]
+        if index is not None:
+            return self._rank_with_index(sections, query_embedding, top_k, index)
+        section_embeddings = self.encode_sections(sections, show_progress_bar=sys.stderr.isatty())
+        with span("cosine_scoring", sections=len(sections)):
+            cosine_scores = (section_embeddings @ query_embedding).astype(np.float64)
+            # Rank on rounded scores so ties resolve in extraction order, as the old full sort did
+            top = []
+            for i in top_k_indices(np.round(cosine_scores, 4), top_k).tolist():
+                sections[i]['relevance_score'] = round(cosine_scores[i].item(), 4)
+                top.append(sections[i])
+            return top
+    def rank_stream(self, batches, query, top_k):
+        """Ranks (doc_index, sections) batches as they arrive, holding only a running top-k.
+
+        The result equals rank() over all batches concatenated in doc_index order, ties included.
+        """
+        if not self.model: raise RuntimeError("Model not loaded.")
+        query_embedding = self._encode([query])[0]
+        heap = []  # min-heap of (rounded score, -doc_index, -position, raw score, section)
+        with progress_bar(desc="Ranking", unit="doc") as pbar:
+            for doc_index, sections in batches:
+                pbar.update(1)
+                if not sections: continue
+                cosine_scores = (self.encode_sections(sections) @ query_embedding).astype(np.float64)
+                rounded = np.round(cosine_scores, 4)
+                with span("cosine_scoring", sections=len(sections)):
+                    for i in top_k_indices(rounded, top_k).tolist():
+                        entry = (rounded[i].item(), -doc_index, -i, cosine_scores[i].item(), sections[i])
+                        if len(heap) < top_k:
+                            heapq.heappush(heap, entry)
+                        elif entry[:3] > heap[0][:3]:
+                            heapq.heapreplace(heap, entry)
+        top = []
+        for _, _, _, score, section in sorted(heap, key=lambda e: e[:3], reverse=True):
+            section['relevance_score'] = round(score, 4)
+            top.append(section)
+        return top
+    def rank_store(self, store, query, top_k, rows=None, index=None, chunk_size=4096):
+        """Top-k rows of a SectionStore (or of its `rows`), best first, as section dicts.
+
+        Rows are encoded chunk by chunk and scored into store.scores (float32) while a k-entry heap
+        keeps the winners, so only one chunk of embeddings is in memory and only the winners become
+        dicts. Ties go to the earlier row, as in rank(). With a SectionIndex, the index search is used
+        instead and store.scores is left as is.
+        """
+        if not self.model: raise RuntimeError("Model not loaded.")
+        rows = np.arange(len(store)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if not len(rows): return []
+        query_embedding = self._encode([query])[0]
+        if index is not None:
+            hits = self._search_index(lambda chunk: store.texts(rows[chunk].tolist()), len(rows),
+                                      query_embedding, top_k, index, chunk_size)
+            hits = [(rows[i].item(), score) for i, score in hits]
+        else:
+            store.reset_scores()
+            heap = []  # min-heap of (rounded score, -row, raw score)
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                cosine_scores = (self.encode_texts(store.texts(chunk.tolist())) @ query_embedding).astype(np.float64)
+                with span("cosine_scoring", sections=len(chunk)):
+                    store.scores[chunk] = cosine_scores
+                    rounded = np.round(cosine_scores, 4)
+                    for i in top_k_indices(rounded, top_k).tolist():
+                        _push_top_k(heap, (rounded[i].item(), -chunk[i].item(), cosine_scores[i].item()), top_k)
+            hits = [(-neg_row, score) for _, neg_row, score in sorted(heap, reverse=True)]
+        top = []
+        for row, score in hits:
+            section = store.section(row)
+            section['relevance_score'] = round(score, 4)
+            top.append(section)
+        return top
+    def rank_many(self, sections, queries, top_k, candidates=None, index=None, chunk_size=4096):
+        """Top-k per query over one encoding of the sections (a list of dicts or a SectionStore).
+
+        Sections are shared between queries, so scores are not written onto them: returns, per query,
+        a best-first list of (section index, relevance score) with rank()'s tie order. candidates
+        optionally limits each query to a list of section indices (see BM25Index.prefilter); only
+        their union is encoded. Sections are encoded and scored against every query a chunk at a
+        time, keeping a k-entry heap per query. With a SectionIndex, each query is answered by an
+        index search instead, as rank_store() does, so results match single-query runs.
+        """
+        if not self.model: raise RuntimeError("Model not loaded.")
+        if not len(sections): return [[] for _ in queries]
+        if index is not None:
+            return self._rank_many_with_index(sections, queries, top_k, candidates, index, chunk_size)
+        pool = np.arange(len(sections))
+        if candidates is not None:
+            pool = np.array(sorted(set().union(*candidates)), dtype=np.int64)
+            allowed = [np.isin(pool, list(c)) for c in candidates]
+        query_embeddings = self._encode(list(queries))
+        heaps = [[] for _ in queries]  # min-heaps of (rounded score, -index, raw score)
+        for start in range(0, len(pool), chunk_size):
+            chunk = pool[start:start + chunk_size]
+            section_embeddings = self.encode_texts(self.section_texts(sections, chunk.tolist()))
+            with span("cosine_scoring", sections=len(chunk), queries=len(queries)):
+                cosine_scores = (query_embeddings @ section_embeddings.T).astype(np.float64)
+                rounded = np.round(cosine_scores, 4)
+                if candidates is not None:
+                    for ranks, mask in zip(rounded, allowed):
+                        ranks[~mask[start:start + chunk_size]] = -np.inf
+                for heap, row, ranks in zip(heaps, cosine_scores, rounded):
+                    for i in top_k_indices(ranks, top_k).tolist():
+                        if ranks[i] > -np.inf:
+                            _push_top_k(heap, (ranks[i].item(), -chunk[i].item(), row[i].item()), top_k)
+        return [[(-neg_index, round(score, 4)) for _, neg_index, score in sorted(heap, reverse=True)]
+                for heap in heaps]
+    def _rank_many_with_index(self, sections, queries, top_k, candidates, index, chunk_size):
+        rankings = []
+        for n, query_embedding in enumerate(self._encode(list(queries))):
+            rows = np.arange(len(sections)) if candidates is None else np.asarray(candidates[n], dtype=np.int64)
+            if not len(rows):
+                rankings.append([])
+                continue
+            texts_of = lambda chunk, rows=rows: self.section_texts(sections, rows[chunk].tolist())
+            hits = self._search_index(texts_of, len(rows), query_embedding, top_k, index, chunk_size)
+            rankings.append([(rows[i].item(), round(score, 4)) for i, score in hits])
+        return rankings
+    def _search_index(self, texts_of, count, query_embedding, top_k, index, chunk_size=4096):
+        """[(position, score)] of the top_k of count sections by SectionIndex search, adding missing ones first.
+
+        texts_of(slice) returns the texts at those positions; it is called a chunk at a time, so only the
+        content hashes of all sections are held at once.
+        """
+        positions = {}  # key -> every position with that text, so identical sections all stay rankable
+        for start in range(0, count, chunk_size):
+            texts = texts_of(slice(start, min(start + chunk_size, count)))
+            keys = [self.section_key(text) for text in texts]
+            missing = [i for i, key in enumerate(keys) if key not in index]
+            if missing:
+                index.add([keys[i] for i in missing], self.encode_texts([texts[i] for i in missing]))
+            for i, key in enumerate(keys, start):
+                positions.setdefault(key, []).append(i)
+
+        # The index may hold sections of other collections too: widen the search until top_k are ours
+        with span("index_search", sections=count):
+            fetch = top_k
+            while True:
+                found, scores = index.search(query_embedding, fetch)
+                hits = [(i, score) for key, score in zip(found, scores.tolist()) for i in positions.get(key, ())]
+                if len(hits) >= top_k or fetch >= len(index):
+                    break
+                fetch *= 4
+        return hits[:top_k]
+    def _rank_with_index(self, sections, query_embedding, top_k, index):
+        top = []
+        texts_of = lambda chunk: [self.section_text(sec) for sec in sections[chunk]]
+        for i, score in self._search_index(texts_of, len(sections), query_embedding, top_k, index):
+            sections[i]['relevance_score'] = round(score, 4)
+            top.append(sections[i])
+        return top
+
+def _push_top_k(heap, entry, k):
+    """Keeps the k largest entries in a min-heap."""
+    if len(heap) < k:
+        heapq.heappush(heap, entry)
+    elif entry > heap[0]:
+        heapq.heapreplace(heap, entry)
+
+def _summarize_chunk(texts, num_sentences):
+    # Module-level so the summarizer's process pool can pickle it
+    summarizer = Summarizer(workers=1)
+    return [summarizer.summarize(text, num_sentences) for text in texts]
 
 class Summarizer:
+    def __init__(self, workers: int = None, min_parallel: int = 32):
+        # Process-pool size for summarize_many (None = one per CPU); smaller batches stay in-process
+        self.workers = workers or os.cpu_count() or 1
+        self.min_parallel = min_parallel
+        self._executor = None
+        self._executor_size = 0
+        self._executor_lock = threading.Lock()
     def summarize(self, text, num_sentences=3):
+        """The num_sentences highest-scoring sentences, in document order; a sentence scores the corpus
+        frequency of each content word it contains."""
         cleaned_text = _clean_text(text)
-        if not cleaned_text or not STOPWORDS: return "Content could not be summarized."
+        stop_words = load_stopwords()
+        if not cleaned_text or not stop_words: return "Content could not be summarized."
         try:
+            sent_tokenize, word_tokenize = load_tokenizers()
             sents = sent_tokenize(cleaned_text)
             if len(sents) <= num_sentences: return cleaned_text
-            words = word_tokenize(cleaned_text.lower())
-            freq = defaultdict(int)
-            for word in words:
-                if word.isalnum() and word not in STOPWORDS: freq[word] += 1
-            if not freq: return " ".join(sents[:num_sentences])
-            scores = {sent: sum(freq[word] for word in word_tokenize(sent.lower()) if word in freq) for sent in sents}
-            ranked_sents = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-            return " ".join([sent for sent, _ in ranked_sents[:num_sentences]])
+            # One tokenization pass builds the sparse sentence x term matrix as (sentence, term id) pairs
+            vocab, owners, term_ids = {}, [], []
+            for n, sent in enumerate(sents):
+                for word in word_tokenize(sent.lower(), preserve_line=True):
+                    if word.isalnum() and word not in stop_words:
+                        owners.append(n)
+                        term_ids.append(vocab.setdefault(word, len(vocab)))
+            if not term_ids: return " ".join(sents[:num_sentences])
+            term_ids = np.asarray(term_ids)
+            freq = np.bincount(term_ids)
+            scores = np.bincount(owners, weights=freq[term_ids], minlength=len(sents))
+            # A repeated sentence is picked at most once, at its first occurrence; ties go to the earlier one
+            first = {}
+            repeats = [n for n, sent in enumerate(sents) if first.setdefault(sent, n) != n]
+            scores[repeats] = -1
+            chosen = np.sort(top_k_indices(scores, num_sentences))
+            return " ".join(sents[i] for i in chosen.tolist() if scores[i] >= 0)
         except Exception:
-            return cleaned_text
\ No newline at end of file
+            return cleaned_text
+    def load_assets(self):
+        """Loads the stopwords and tokenizers ahead of the first summarize() (e.g. on a background thread)."""
+        load_stopwords()
+        load_tokenizers()
+    def summarize_many(self, texts, num_sentences=3):
+        """summarize() for each text, in input order, fanned out over worker processes for large batches."""
+        texts = list(texts)
+        if self.workers <= 1 or len(texts) < self.min_parallel:
+            return [self.summarize(text, num_sentences) for text in texts]
+        size = -(-len(texts) // (self.workers * 4))
+        chunks = [texts[i:i + size] for i in range(0, len(texts), size)]
+        futures = [_submit(self, len(chunks), _summarize_chunk, chunk, num_sentences) for chunk in chunks]
+        summaries, suspects = [None] * len(chunks), []
+        for n, (executor, future) in enumerate(futures):
+            try:
+                summaries[n] = future.result()
+            except BrokenProcessPool:
+                _restart_pool(self, executor)
+                suspects.append(n)
+        # Chunks lost to a dead worker are retried one at a time on a fresh pool
+        for n in suspects:
+            executor, future = _submit(self, len(chunks), _summarize_chunk, chunks[n], num_sentences)
+            try:
+                summaries[n] = future.result()
+            except BrokenProcessPool:
+                _restart_pool(self, executor)
+                print(f"  [ERROR] Summarizer worker crashed on {len(chunks[n])} sections")
+                summaries[n] = ["Content could not be summarized."] * len(chunks[n])
+        return [summary for chunk in summaries for summary in chunk]
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,168 @@
+import os
+import threading
+import numpy as np
+
+INDEX_VERSION = 1
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, via partial selection instead of a full sort.
+
+    Ties keep input order, exactly like a stable descending sort truncated to k.
+    """
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= n:
+        return np.argsort(-scores, kind="stable")
+    kth = np.partition(scores, n - k)[n - k]
+    above = np.flatnonzero(scores > kth)
+    ties = np.flatnonzero(scores == kth)[:k - len(above)]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.argsort(-scores[chosen], kind="stable")]
+
+
+def _spherical_kmeans(x: np.ndarray, n_lists: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = x[rng.choice(len(x), n_lists, replace=False)].copy()
+    for _ in range(iterations):
+        assign = _nearest(x, centroids)
+        order = np.argsort(assign, kind="stable")
+        members, starts = np.unique(assign[order], return_index=True)
+        sums = np.zeros_like(centroids)
+        sums[members] = np.add.reduceat(x[order], starts, axis=0)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        empty = norms[:, 0] == 0
+        centroids[~empty] = sums[~empty] / norms[~empty]
+    return centroids
+
+
+def _nearest(x: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+    """Closest centroid (by inner product) per row, in chunks so the distance matrix stays small."""
+    return np.concatenate([
+        np.argmax(x[i:i + chunk] @ centroids.T, axis=1) for i in range(0, len(x), chunk)
+    ]) if len(x) else np.zeros(0, dtype=np.int64)
+
+
+class SectionIndex:
+    """Inverted-file (IVF) index over normalized section embeddings, keyed by section content hash.
+
+    Vectors are bucketed under their nearest k-means centroid and a search scans only the nprobe
+    closest buckets, so nprobe trades recall for latency. Until the index holds exact_threshold
+    vectors it is untrained and every search is exact. Adds are incremental: new vectors are
+    assigned to existing centroids without retraining.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 8, exact_threshold: int = 20_000):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.exact_threshold = exact_threshold
+        self.keys = []
+        self.key_to_id = {}
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.size = 0
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self._lists = None  # (order, offsets): ids grouped by centroid, rebuilt after adds
+
+    def __len__(self):
+        return self.size
+
+    def __contains__(self, key):
+        return key in self.key_to_id
+
+    def add(self, keys: list, vectors: np.ndarray):
+        fresh = [i for i, key in enumerate(keys) if key not in self.key_to_id]
+        if not fresh:
+            return
+        new = np.asarray(vectors, dtype=np.float32)[fresh]
+        if self.size + len(new) > len(self.vectors):
+            grown = np.zeros((max(self.size + len(new), 2 * len(self.vectors)), self.dim), dtype=np.float32)
+            grown[:self.size] = self.vectors[:self.size]
+            self.vectors = grown
+        self.vectors[self.size:self.size + len(new)] = new
+        for i in fresh:
+            self.key_to_id[keys[i]] = len(self.keys)
+            self.keys.append(keys[i])
+        self.size += len(new)
+
+        if self.centroids is not None:
+            self.assignments = np.concatenate([self.assignments, _nearest(new, self.centroids).astype(np.int32)])
+            self._lists = None
+        elif self.size >= self.exact_threshold:
+            self.train()
+
+    def train(self, n_lists: int = None, sample: int = 50_000, seed: int = 0):
+        """(Re)builds the centroids from a sample of the stored vectors and reassigns every vector."""
+        data = self.vectors[:self.size]
+        n_lists = min(n_lists or max(1, int(4 * np.sqrt(self.size))), self.size)
+        rng = np.random.default_rng(seed)
+        training = data[rng.choice(self.size, min(sample, self.size), replace=False)]
+        self.centroids = _spherical_kmeans(training, n_lists, seed=seed)
+        self.assignments = _nearest(data, self.centroids).astype(np.int32)
+        self._lists = None
+
+    def _inverted_lists(self):
+        if self._lists is None:
+            order = np.argsort(self.assignments, kind="stable")
+            offsets = np.searchsorted(self.assignments[order], np.arange(len(self.centroids) + 1))
+            self._lists = (order, offsets)
+        return self._lists
+
+    def search(self, query: np.ndarray, k: int, nprobe: int = None):
+        """Returns (keys, scores) of the k most similar stored vectors, best first."""
+        if self.size == 0:
+            return [], np.zeros(0, dtype=np.float32)
+        query = np.asarray(query, dtype=np.float32)
+        if self.centroids is None:
+            candidates = None
+            scores = self.vectors[:self.size] @ query
+        else:
+            order, offsets = self._inverted_lists()
+            nprobe = min(nprobe or self.nprobe, len(self.centroids))
+            probe = top_k_indices(self.centroids @ query, nprobe)
+            candidates = np.sort(np.concatenate([order[offsets[c]:offsets[c + 1]] for c in probe]))
+            scores = self.vectors[candidates] @ query
+        best = top_k_indices(scores, k)
+        ids = best if candidates is None else candidates[best]
+        return [self.keys[i] for i in ids], scores[best]
+
+    def save(self, path: str):
+        # Per-writer temp name: concurrent saves of the same path never write into one file
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npz"
+        np.savez(
+            tmp,
+            version=INDEX_VERSION,
+            params=np.array([self.dim, self.nprobe, self.exact_threshold]),
+            keys=np.array(self.keys, dtype=str),
+            vectors=self.vectors[:self.size],
+            centroids=self.centroids if self.centroids is not None else np.zeros((0, self.dim), np.float32),
+            assignments=self.assignments,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str, dim: int, nprobe: int = None, exact_threshold: int = None):
+        """Loads an index saved with save(), or returns a new empty one if it is missing or incompatible.
+
+        nprobe and exact_threshold, when given, replace the saved values; an untrained index that
+        already holds exact_threshold vectors is trained right away.
+        """
+        params = {k: v for k, v in (("nprobe", nprobe), ("exact_threshold", exact_threshold)) if v is not None}
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                stored_dim, stored_nprobe, stored_threshold = (int(v) for v in data["params"])
+                if int(data["version"]) != INDEX_VERSION or stored_dim != dim:
+                    raise ValueError("incompatible index")
+                index = cls(dim, **{"nprobe": stored_nprobe, "exact_threshold": stored_threshold, **params})
+                index.keys = data["keys"].tolist()
+                index.vectors = data["vectors"].copy()
+                index.centroids = data["centroids"] if len(data["centroids"]) else None
+                index.assignments = data["assignments"]
+        except (OSError, ValueError, KeyError):
+            return cls(dim, **params)
+        index.key_to_id = {key: i for i, key in enumerate(index.keys)}
+        index.size = len(index.keys)
+        if index.centroids is None and index.size and index.size >= index.exact_threshold:
+            index.train()
+        return index
@@ -0,0 +1,45 @@
+"""Check that the modules each challenge ships its own copy of are still byte-identical.
+
+    python benchmarks/check_copies.py
+
+Each challenge builds its own container, so shared modules are duplicated under a per-challenge name.
+Exit status is 1 when any pair has drifted; run_benchmarks.py runs the same check before timing.
+"""
+import os
+import sys
+import difflib
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (Challenge 1A path, Challenge 1B path), relative to the repository root
+COPIES = [
+    ("Challenge_1a/docstore.py", "Challenge_1b/docstore_1b.py"),
+    ("Challenge_1a/tracing.py", "Challenge_1b/tracing_1b.py"),
+]
+
+
+def drifted():
+    """Unified diffs of every pair in COPIES whose files differ."""
+    diffs = []
+    for left, right in COPIES:
+        with open(os.path.join(ROOT, left), encoding="utf-8") as f:
+            a = f.readlines()
+        with open(os.path.join(ROOT, right), encoding="utf-8") as f:
+            b = f.readlines()
+        if a != b:
+            diffs.append("".join(difflib.unified_diff(a, b, left, right)))
+    return diffs
+
+
+def main():
+    diffs = drifted()
+    for diff in diffs:
+        print(diff)
+    if diffs:
+        print(f"{len(diffs)} copied module(s) drifted; apply the change to both copies.")
+        sys.exit(1)
+    print(f"All {len(COPIES)} copied modules are identical.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""Time each pipeline stage of both challenges on a synthetic corpus and compare against a baseline.
+
+    python benchmarks/run_benchmarks.py --pages 10,50,200 --docs 4 --output results.json
+    python benchmarks/run_benchmarks.py --baseline benchmarks/baseline.json --threshold 0.25
+
+Exit status is 1 when any stage is slower than its baseline by more than the threshold.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+from contextlib import contextmanager
+
+from check_copies import drifted
+from synth import FONTS, generate_corpus, synthetic_sections
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHALLENGE_1A = os.path.join(ROOT, "Challenge_1a")
+CHALLENGE_1B = os.path.join(ROOT, "Challenge_1b")
+
+
+@contextmanager
+def working_dir(path):
+    """Challenge_1b resolves ./models and ./nltk_data relative to the working directory."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return times, result
+
+
+def record(results, stage, pages, docs, times, items):
+    median = statistics.median(times)
+    results.append({
+        "stage": stage,
+        "pages": pages,
+        "docs": docs,
+        "items": items,
+        "seconds_median": round(median, 6),
+        "seconds_min": round(min(times), 6),
+        "pages_per_second": round(pages * docs / median, 2) if pages and median else None,
+    })
+    print(f"  {stage:<28} pages={pages:<5} docs={docs:<3} median={median:8.4f}s  items={items}")
+
+
+def bench_1a(results, corpus, pages, repeat):
+    sys.path.insert(0, CHALLENGE_1A)
+    from main import extract_from_pdf
+
+    def run():
+        return [extract_from_pdf(path) for path in corpus]
+
+    times, outlines = timed(run, repeat)
+    record(results, "1a.extract_from_pdf", pages, len(corpus), times,
+           sum(len(o["outline"]) for o in outlines))
+
+
+def bench_1b(results, corpus, pages, repeat):
+    sys.path.insert(0, CHALLENGE_1B)
+    with working_dir(CHALLENGE_1B):
+        from utils_1b import SectionExtractor
+
+        extractor = SectionExtractor()
+        times, sections = timed(lambda: extractor.extract_parallel(corpus), repeat)
+        record(results, "1b.extract_parallel", pages, len(corpus), times, len(sections))
+
+
+def bench_1b_ranking(results, repeat, sections_count, top_k):
+    """Ranking and summarization scale with section count, not pages, so they run once per sweep."""
+    sys.path.insert(0, CHALLENGE_1B)
+    with working_dir(CHALLENGE_1B):
+        from utils_1b import RelevanceRanker, Summarizer
+        from sections_1b import SectionStore
+
+        sections = synthetic_sections(sections_count)
+        ranker = RelevanceRanker()
+        ranker.load_model()
+        query = "Persona: HR professional. Task: Create and manage fillable forms for onboarding and compliance."
+        times, _ = timed(lambda: ranker.rank(sections, query, top_k=top_k), repeat)
+        record(results, "1b.rank", 0, 0, times, len(sections))
+
+        store = SectionStore()
+        store.extend(sections)
+        times, _ = timed(lambda: ranker.rank_store(store, query, top_k=top_k), repeat)
+        record(results, "1b.rank_store", 0, 0, times, len(store))
+
+        summarizer = Summarizer()
+        summarized = [s["content"] for s in sections[:top_k]]
+        times, _ = timed(lambda: summarizer.summarize_many(summarized), repeat)
+        record(results, "1b.summarize", 0, 0, times, len(summarized))
+
+
+def compare(results, baseline, threshold):
+    """Return a list of human-readable regressions against a previous results file."""
+    previous = {(r["stage"], r["pages"], r["docs"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for r in results:
+        old = previous.get((r["stage"], r["pages"], r["docs"]))
+        if not old or not old["seconds_median"]:
+            continue
+        ratio = r["seconds_median"] / old["seconds_median"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{r['stage']} (pages={r['pages']}, docs={r['docs']}): "
+                               f"{old['seconds_median']:.4f}s → {r['seconds_median']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default="10,50", help="comma-separated page counts to sweep")
+    parser.add_argument("--docs", type=int, default=4, help="documents per corpus")
+    parser.add_argument("--heading-density", type=float, default=0.15)
+    parser.add_argument("--fonts", default=",".join(FONTS), help="comma-separated base-14 font names")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=500, help="section count for rank/summarize")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--only", choices=("1a", "1b"), help="benchmark a single challenge")
+    parser.add_argument("--corpus-dir", default=os.path.join(ROOT, "benchmarks", ".corpus"))
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, e.g. 0.2 = 20%%")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if drifted():
+        sys.exit("Copied modules differ between the challenges; see python benchmarks/check_copies.py")
+    fonts = tuple(args.fonts.split(","))
+    results = []
+    for pages in [int(p) for p in args.pages.split(",")]:
+        corpus = generate_corpus(args.corpus_dir, args.docs, pages, args.heading_density, fonts, args.seed)
+        print(f"Corpus: {args.docs} x {pages} pages")
+        if args.only in (None, "1a"):
+            bench_1a(results, corpus, pages, args.repeat)
+        if args.only in (None, "1b"):
+            bench_1b(results, corpus, pages, args.repeat)
+    if args.only in (None, "1b"):
+        print(f"Sections: {args.sections}")
+        bench_1b_ranking(results, args.repeat, args.sections, args.top_k)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Time Challenge 1B cold start: each scenario runs in a fresh interpreter, so import costs are real.
+
+    python benchmarks/startup.py --repeat 5 --output startup_results.json
+    python benchmarks/startup.py --baseline benchmarks/startup_baseline.json --threshold 0.25
+
+Exit status is 1 when any scenario is slower than its baseline by more than the threshold.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+from run_benchmarks import CHALLENGE_1B, ROOT, compare, record
+from synth import generate_corpus
+
+# Each snippet runs in Challenge_1b/ with PDF set to a small synthetic document
+SCENARIOS = {
+    "import_main": "import main_1b",
+    "extract": "from utils_1b import SectionExtractor\nSectionExtractor(1).extract_parallel([PDF])",
+    "stopwords": "import utils_1b\nutils_1b.STOPWORDS",
+    "summarize": "from utils_1b import Summarizer\nSummarizer(1).summarize('One. Two three. Four five six. Seven.')",
+    "load_model_torch": "from utils_1b import RelevanceRanker\nRelevanceRanker(backend='torch').load_model()",
+    "load_model_onnx": "from utils_1b import RelevanceRanker\nRelevanceRanker(backend='onnx').load_model()",
+}
+
+
+def run_scenario(code, pdf):
+    """Wall time of a fresh `python -c` running the snippet, or None when the scenario fails."""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", f"PDF = {pdf!r}\n{code}"], cwd=CHALLENGE_1B,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        last_line = (proc.stderr.strip().splitlines() or ["failed"])[-1]
+        return None, last_line
+    return elapsed, None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", help="comma-separated scenario names (default: all)")
+    parser.add_argument("--corpus-dir", default=os.path.join(ROOT, "benchmarks", ".corpus"))
+    parser.add_argument("--output", default="startup_results.json")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, e.g. 0.2 = 20%%")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names = args.only.split(",") if args.only else list(SCENARIOS)
+    pdf = generate_corpus(args.corpus_dir, 1, 2)[0]
+
+    # Baseline for everything else: a bare interpreter
+    baseline_times = [run_scenario("pass", pdf)[0] for _ in range(args.repeat)]
+    results = []
+    record(results, "startup.python", 0, 0, baseline_times, 1)
+    for name in names:
+        times = []
+        for _ in range(args.repeat):
+            elapsed, error = run_scenario(SCENARIOS[name], pdf)
+            if error:
+                print(f"  startup.{name:<20} skipped: {error}")
+                break
+            times.append(elapsed)
+        if times:
+            record(results, f"startup.{name}", 0, 0, times, 1)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
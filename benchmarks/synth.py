@@ -0,0 +1,84 @@
+"""Deterministic synthetic PDF corpus for the benchmarks (no network, no sample data needed)."""
+import os
+import random
+
+import fitz  # PyMuPDF
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 56
+FONTS = ("helv", "tiro", "cour")
+
+WORDS = (
+    "acrobat form field signature document export share review comment page layout "
+    "template workflow onboarding compliance policy employee request approval data "
+    "table image scan text edit convert archive security password recipient deadline"
+).split()
+
+
+def _sentence(rng, min_words=8, max_words=18):
+    words = rng.choices(WORDS, k=rng.randint(min_words, max_words))
+    return " ".join(words).capitalize() + "."
+
+
+def _heading(rng):
+    return " ".join(rng.choices(WORDS, k=rng.randint(2, 5))).title()
+
+
+def generate_pdf(path, pages, heading_density=0.15, fonts=FONTS, seed=0):
+    """Write a PDF with a large title, numbered/unnumbered headings at three sizes and body paragraphs.
+
+    heading_density is the probability that any given line is a heading.
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+        y = MARGIN
+        if page_num == 0:
+            page.insert_text((MARGIN, y), "Synthetic Benchmark Report", fontsize=24, fontname=fonts[0])
+            y += 40
+        section = 0
+        while y < PAGE_HEIGHT - MARGIN:
+            if rng.random() < heading_density:
+                section += 1
+                level = rng.choice((0, 1, 2))
+                text = _heading(rng)
+                if level:
+                    text = f"{page_num + 1}.{section} {text}"
+                size = (18, 15, 13)[level]
+                page.insert_text((MARGIN, y), text, fontsize=size, fontname=fonts[0])
+                y += size + 10
+            else:
+                font = rng.choice(fonts)
+                page.insert_text((MARGIN, y), _sentence(rng, 6, 10), fontsize=10, fontname=font)
+                y += 14
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return path
+
+
+def generate_corpus(out_dir, docs, pages, heading_density=0.15, fonts=FONTS, seed=0):
+    """Generate `docs` PDFs of `pages` pages each; returns their paths. Reuses files already on disk."""
+    os.makedirs(out_dir, exist_ok=True)
+    paths = []
+    for i in range(docs):
+        name = f"synthetic_p{pages}_h{int(heading_density * 100)}_{'-'.join(fonts)}_s{seed}_{i}.pdf"
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            generate_pdf(path, pages, heading_density, fonts, seed=seed * 1000 + i)
+        paths.append(path)
+    return paths
+
+
+def synthetic_sections(count, seed=0):
+    """Section dicts shaped like SectionExtractor output, for ranking/summarization timings."""
+    rng = random.Random(seed)
+    return [
+        {
+            "title": _heading(rng),
+            "content": " ".join(_sentence(rng) for _ in range(rng.randint(3, 12))),
+            "source": f"synthetic_{i % 10}.pdf",
+            "page": 1 + i % 50,
+        }
+        for i in range(count)
+    ]